@@ -0,0 +1,141 @@
+"""End-to-end offline benchmark of the whole actor against the local stand-in.
+
+Usage:
+    python bench/bench_e2e.py [RECORD_DIR] [--synthetic N] [--mode direct|browser]
+                              [--latency-ms 50] [--max-posts 20] [--concurrency 5]
+                              [--browser-processes 0] [--pagination scroll|fetch]
+                              [--enrich-authors]
+
+RECORD_DIR is a recording made with the ``record_dir`` input. With
+``--synthetic N`` (the default when no directory is given) a recording of N
+keywords is generated first. The actor's ``main()`` runs unchanged against the
+stand-in on a throwaway local storage directory; the script then reports
+keywords/min, videos/s, parse µs/aweme and peak RSS from the run metrics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_stream_decoder import synthetic_body  # noqa: E402
+
+
+def write_synthetic_recording(root: str, keywords: int, pages: int = 3):
+    from src.recorder import HOT_LIST_FILE, keyword_dir
+
+    words = [{"word": f"趋势{i:03d}", "hot_value": 1_000_000 - i * 1000} for i in range(keywords)]
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, HOT_LIST_FILE), "w", encoding="utf-8") as fh:
+        json.dump({"data": {"word_list": words}}, fh, ensure_ascii=False)
+
+    for i, word in enumerate(words):
+        directory = keyword_dir(root, word["word"])
+        os.makedirs(directory, exist_ok=True)
+        for page in range(pages):
+            body = synthetic_body(objects=1, awemes=10, id_prefix=f"7{i:03d}{page:02d}")
+            kind = "stream" if page == 0 else "single"
+            with open(os.path.join(directory, f"{page:03d}_{kind}.bin"), "wb") as fh:
+                fh.write(body)
+
+
+def prepare_storage(storage: str, actor_input: dict):
+    default_store = os.path.join(storage, "key_value_stores", "default")
+    os.makedirs(default_store, exist_ok=True)
+    with open(os.path.join(default_store, "INPUT.json"), "w", encoding="utf-8") as fh:
+        json.dump(actor_input, fh)
+    os.environ["APIFY_LOCAL_STORAGE_DIR"] = storage
+    os.environ["CRAWLEE_STORAGE_DIR"] = storage
+    os.environ["CRAWLEE_PURGE_ON_START"] = "0"
+
+
+async def run(args, record_dir: str) -> float:
+    import standin_server
+    from src.main import main as actor_main
+
+    runner = await standin_server.start(record_dir, port=args.port, latency_ms=args.latency_ms)
+    started = time.perf_counter()
+    try:
+        await actor_main()
+    except SystemExit:
+        # Actor.exit() ends the process normally; we still want the report.
+        pass
+    finally:
+        elapsed = time.perf_counter() - started
+        await runner.cleanup()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("record_dir", nargs="?")
+    parser.add_argument("--synthetic", type=int, default=10)
+    parser.add_argument("--mode", choices=["direct", "browser"], default="direct")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--max-posts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--pagination", choices=["scroll", "fetch"], default="scroll")
+    parser.add_argument("--browser-processes", type=int, default=0)
+    parser.add_argument("--enrich-authors", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Must be set before any src module builds its endpoint URLs.
+    os.environ["DOUYIN_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        record_dir = args.record_dir
+        if not record_dir:
+            record_dir = os.path.join(tmp, "recording")
+            write_synthetic_recording(record_dir, args.synthetic)
+
+        keywords = len(os.listdir(os.path.join(record_dir, "search")))
+        prepare_storage(
+            os.path.join(tmp, "storage"),
+            {
+                "max_hashtags": min(50, keywords),
+                "max_posts_per_hashtag": args.max_posts,
+                "concurrency": args.concurrency,
+                "browser_processes": args.browser_processes,
+                "pagination": args.pagination,
+                "direct_api": args.mode == "direct",
+                "session_store_name": "bench-session",
+                "enrich_authors": args.enrich_authors,
+                "profile_store_name": "bench-profiles",
+            },
+        )
+        elapsed = asyncio.run(run(args, record_dir))
+
+    from src.metrics import metrics
+
+    summary = metrics.summary()
+    counters = summary["counters"]
+    parse = summary["timings"].get("parse_aweme", {})
+    enrich = summary["timings"].get("author_enrich", {})
+    keywords_done = counters.get("keywords_succeeded", 0)
+    videos = counters.get("videos_pushed", 0)
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"mode                {args.mode}")
+    print(f"wall time           {elapsed:.2f} s")
+    print(f"keywords/min        {keywords_done / (elapsed / 60):.1f}  ({keywords_done:g} keywords)")
+    print(f"videos/s            {videos / elapsed:.1f}  ({videos:g} videos)")
+    print(f"parse µs/aweme      {parse.get('avg_s', 0) * 1e6:.1f}")
+    if args.enrich_authors:
+        print(
+            f"author enrichment   {enrich.get('total_s', 0):.2f} s  "
+            f"({counters.get('profiles_fetched', 0):g} fetched, {counters.get('profile_cache_hits', 0):g} cached)"
+        )
+    print(f"peak RSS (python)   {self_rss:.1f} MiB")
+    print(f"peak RSS (children) {child_rss:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
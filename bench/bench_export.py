@@ -0,0 +1,159 @@
+"""Compare the output formats: nested JSON, normalized JSON and Parquet.
+
+Usage:
+    python bench/bench_export.py [BODY_FILE_OR_DIR ...] [--keywords 50] [--videos 50]
+
+Awemes come from recorded search bodies (see bench_stream_decoder.py) or a
+synthetic body. ``--keywords`` x ``--videos`` records are written as the
+dataset's JSON records (through ``JsonLinesWriter``), in ``normalized`` output
+mode with every dataset going to its own JSON-lines file, and through the
+Parquet export. Write time covers building and serializing the records, which
+is what ``push_data`` pays for. Load time (best of 3) is reading every record back:
+``json.loads`` per line against ``pyarrow.parquet.read_table`` per table.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_parse import extract_awemes  # noqa: E402
+from bench_stream_decoder import load_bodies, synthetic_body  # noqa: E402
+from src.aggregate import KeywordStats  # noqa: E402
+from src.output import DatasetWriter, JsonLinesWriter, NormalizedDatasetWriter  # noqa: E402
+from src.parquet_export import TABLES, parquet_export  # noqa: E402
+from src.utils import parse_douyin_video  # noqa: E402
+
+
+class NormalizedJsonLinesWriter(NormalizedDatasetWriter):
+    def __init__(self, directory: str, batch_size: int = 500):
+        super().__init__(batch_size=batch_size)
+        self.directory = directory
+        self.files = {}
+
+    def _file(self, name: str):
+        if name not in self.files:
+            self.files[name] = open(os.path.join(self.directory, f"{name}.jsonl"), "w", encoding="utf-8")
+        return self.files[name]
+
+    async def _push(self, batch):
+        await self._push_entities("videos", batch)
+
+    async def _push_entities(self, name, batch):
+        fh = self._file(name)
+        for record in batch:
+            fh.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        for fh in self.files.values():
+            fh.close()
+
+
+async def write(writer, awemes, keywords: int, per_keyword: int):
+    for k in range(keywords):
+        keyword_info = {"keyword": f"趋势{k:03d}", "rank": k + 1, "heat": 1_000_000 - k * 1000}
+        stats = KeywordStats()
+        for i in range(per_keyword):
+            aweme = dict(awemes[(k * per_keyword + i) % len(awemes)], aweme_id=f"7{k:03d}{i:05d}")
+            video = parse_douyin_video(aweme)
+            stats.add(video)
+            await writer.add_video(video, keyword_info)
+        await writer.add_summary(keyword_info, stats, [])
+    await writer.add_aggregates()
+    await writer.flush()
+
+
+class DiscardingWriter(DatasetWriter):
+    async def _push(self, batch):
+        pass
+
+
+def write_nested(awemes, keywords: int, per_keyword: int, json_path: str):
+    with open(json_path, "w", encoding="utf-8") as fh:
+        asyncio.run(write(JsonLinesWriter(fh), awemes, keywords, per_keyword))
+
+
+def write_parquet(awemes, keywords: int, per_keyword: int, directory: str):
+    parquet_export.configure(directory)
+    asyncio.run(write(DiscardingWriter(), awemes, keywords, per_keyword))
+    parquet_export.close()
+    parquet_export.configure(None)
+
+
+def write_normalized(awemes, keywords: int, per_keyword: int, directory: str):
+    os.makedirs(directory, exist_ok=True)
+    writer = NormalizedJsonLinesWriter(directory)
+    asyncio.run(write(writer, awemes, keywords, per_keyword))
+    writer.close()
+
+
+def directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def load_json(*paths: str) -> int:
+    rows = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            rows += sum(1 for line in fh if json.loads(line))
+    return rows
+
+
+def load_parquet(directory: str) -> int:
+    return sum(pq.read_table(os.path.join(directory, f"{table}.parquet")).num_rows for table in TABLES)
+
+
+def timed(fn, *args, repeat: int = 3):
+    """Best of ``repeat`` runs, so one-off import and cache warm-up is not counted."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--keywords", type=int, default=50)
+    parser.add_argument("--videos", type=int, default=50)
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.paths) if args.paths else [("synthetic", synthetic_body(objects=20, awemes=15))]
+    awemes = [a for _, raw in bodies for a in extract_awemes(raw)]
+    if not awemes:
+        sys.exit("No awemes found in the given bodies.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "dataset.jsonl")
+        normalized_dir = os.path.join(tmp, "normalized")
+        parquet_dir = os.path.join(tmp, "parquet")
+        _, nested_write = timed(write_nested, awemes, args.keywords, args.videos, json_path, repeat=1)
+        _, normalized_write = timed(write_normalized, awemes, args.keywords, args.videos, normalized_dir, repeat=1)
+        _, parquet_write = timed(write_parquet, awemes, args.keywords, args.videos, parquet_dir, repeat=1)
+
+        normalized_files = [os.path.join(normalized_dir, name) for name in sorted(os.listdir(normalized_dir))]
+        results = [
+            ("json", os.path.getsize(json_path), nested_write, timed(load_json, json_path)),
+            ("normalized", directory_size(normalized_dir), normalized_write, timed(load_json, *normalized_files)),
+            ("parquet", directory_size(parquet_dir), parquet_write, timed(load_parquet, parquet_dir)),
+        ]
+
+    json_size, json_load = results[0][1], results[0][3][1]
+    print(f"{args.keywords} keywords x {args.videos} videos, {parquet_export.row_groups} Parquet row groups")
+    print(f"{'':<12} {'size KiB':>10} {'write ms':>10} {'load ms':>10} {'rows':>8} {'size':>7} {'load':>7}")
+    for name, size, write_s, (rows, load_s) in results:
+        print(
+            f"{name:<12} {size / 1024:>10.1f} {write_s * 1000:>10.1f} {load_s * 1000:>10.1f} {rows:>8} "
+            f"{json_size / size:>6.1f}x {json_load / load_s:>6.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark parse_douyin_video in fast (plain records) and strict (validated) modes.
+
+Usage:
+    python bench/bench_parse.py [BODY_FILE_OR_DIR ...] [--count N]
+
+Awemes are extracted from recorded /search/stream/ or /search/single/ bodies
+(see bench_stream_decoder.py); without arguments a synthetic body is used. The
+pool is cycled until ``--count`` awemes have been parsed and serialized with
+``model_dump`` in each mode.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stream_decoder import load_bodies, synthetic_body  # noqa: E402
+from src.stream_decoder import decode_stream  # noqa: E402
+from src.utils import parse_douyin_video  # noqa: E402
+
+
+def extract_awemes(raw: bytes):
+    awemes = []
+    for obj in decode_stream(raw):
+        if not isinstance(obj, dict):
+            continue
+        items = obj.get("data") or obj.get("aweme_list") or []
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            aweme = item.get("aweme_info") or (item if "aweme_id" in item else None)
+            if aweme:
+                awemes.append(aweme)
+    return awemes
+
+
+def run(awemes, count: int, strict: bool) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        video = parse_douyin_video(awemes[i % len(awemes)], strict=strict)
+        video.model_dump()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--count", type=int, default=5000)
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.paths) if args.paths else [("synthetic", synthetic_body(objects=20, awemes=15))]
+    awemes = [a for _, raw in bodies for a in extract_awemes(raw)]
+    if not awemes:
+        sys.exit("No awemes found in the given bodies.")
+
+    print(f"{len(awemes)} distinct awemes, {args.count} parses per mode")
+    fast = run(awemes, args.count, strict=False)
+    strict = run(awemes, args.count, strict=True)
+    print(f"{'fast (records)':<24} {fast:>10.0f} records/s")
+    print(f"{'strict (validated)':<24} {strict:>10.0f} records/s")
+    print(f"{'speedup':<24} {fast / strict:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Micro-benchmark: legacy regex chunk splitting vs. the incremental StreamDecoder.
+
+Usage:
+    python bench/bench_stream_decoder.py [BODY_FILE_OR_DIR ...] [--repeat N]
+
+Each file is a raw (optionally gzipped) /search/stream/ or /search/single/ body as
+captured from Douyin. Without arguments a synthetic chunked body is generated so
+the script can run anywhere.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.stream_decoder import decode_stream  # noqa: E402
+
+
+def legacy_decode(raw_bytes: bytes):
+    """The pre-StreamDecoder clean_chunked_body + extract_json_chunks pipeline."""
+    text = raw_bytes.decode("utf-8", errors="ignore")
+    text = re.sub(r"(?mi)^[0-9a-f]+\r?\n", "", text)
+    text = text.strip("\x00\r\n\t ")
+    parsed = []
+    for chunk in re.findall(r"(\{.*?\})(?=\s*\{|\s*$)", text, re.DOTALL):
+        try:
+            parsed.append(json.loads(chunk))
+        except Exception:
+            continue
+    if not parsed:
+        try:
+            parsed = [json.loads(text)]
+        except Exception:
+            pass
+    return parsed
+
+
+def synthetic_body(objects: int = 12, awemes: int = 10, id_prefix: str = "7") -> bytes:
+    parts = []
+    for i in range(objects):
+        obj = {
+            "status_code": 0,
+            "data": [
+                {
+                    "type": 1,
+                    "aweme_info": {
+                        "aweme_id": f"{id_prefix}{i:04d}{j:04d}",
+                        "desc": "不知道吃什么的时候来看看 #抖音美食创作者 #懒人美食" * 2,
+                        "create_time": 1727000000 + j,
+                        "author": {"uid": str(j), "sec_uid": f"MS4wLjABAAAA{j:04d}", "nickname": "栗子日食记",
+                                   "follower_count": 2500000,
+                                   "avatar_thumb": {"url_list": ["https://p3.douyinpic.com/img/avatar.jpg"]}},
+                        "statistics": {"digg_count": 857221, "comment_count": 17537,
+                                       "share_count": 453052, "play_count": 0, "collect_count": 260216},
+                        "video": {"width": 1080, "height": 1920,
+                                  "cover": {"url_list": ["https://p3.douyinpic.com/img/cover.jpg"] * 3}},
+                        "text_extra": [{"hashtag_id": "1582588874644493", "hashtag_name": "懒人美食"}],
+                    },
+                }
+                for j in range(awemes)
+            ],
+            "has_more": 1,
+            "cursor": (i + 1) * awemes,
+        }
+        payload = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        parts.append(b"%x\r\n" % len(payload) + payload + b"\r\n")
+        parts.append(b'{"ack":1}\r\n')
+    return b"".join(parts)
+
+
+def load_bodies(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            files.append(path)
+
+    bodies = []
+    for file in files:
+        with open(file, "rb") as fh:
+            raw = fh.read()
+        if raw[:2] == b"\x1f\x8b":
+            raw = gzip.decompress(raw)
+        bodies.append((os.path.basename(file), raw))
+    return bodies
+
+
+def bench(fn, raw: bytes, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(raw)
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.paths) if args.paths else [("synthetic", synthetic_body())]
+
+    print(f"{'body':<32} {'KiB':>8} {'legacy ms':>10} {'objs':>5} {'stream ms':>10} {'objs':>5} {'speedup':>8}")
+    for name, raw in bodies:
+        legacy_t, legacy_objs = bench(legacy_decode, raw, args.repeat)
+        stream_t, stream_objs = bench(decode_stream, raw, args.repeat)
+        print(
+            f"{name[:32]:<32} {len(raw) / 1024:>8.1f} {legacy_t * 1000:>10.2f} {len(legacy_objs):>5} "
+            f"{stream_t * 1000:>10.2f} {len(stream_objs):>5} {legacy_t / max(stream_t, 1e-9):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
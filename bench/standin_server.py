@@ -0,0 +1,169 @@
+"""Local stand-in for douyin.com that replays bodies saved by ``src.recorder``.
+
+Usage:
+    python bench/standin_server.py RECORD_DIR [--port 8765] [--latency-ms 50]
+
+Then point the actor at it:
+    DOUYIN_BASE_URL=http://127.0.0.1:8765 apify run
+
+Routes:
+    /                                        homepage, sets the session cookies
+    /aweme/v1/web/hot/search/list/           recorded hot_list.json
+    /search/<keyword>                        minimal search page driving the XHRs below
+    /aweme/v1/web/general/search/stream/     recorded body #offset, verbatim (chunked)
+    /aweme/v1/web/general/search/single/     recorded body #offset as one JSON object
+                                             with cursor / has_more rewritten
+    /aweme/v1/web/user/profile/other/        synthetic profile for ?sec_user_id=
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.recorder import HOT_LIST_FILE, SEARCH_DIR, keyword_from_dir  # noqa: E402
+from src.stream_decoder import decode_stream  # noqa: E402
+
+SEARCH_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>stand-in search</title></head>
+<body>
+<div data-e2e="search_general_container" style="height:200000px"></div>
+<script>
+const keyword = decodeURIComponent(location.pathname.split("/").pop());
+let page = 0, loading = false, more = true;
+async function load(kind) {
+  if (loading || !more) return;
+  loading = true;
+  const r = await fetch(`/aweme/v1/web/general/search/${kind}/?keyword=${encodeURIComponent(keyword)}&offset=${page}`);
+  await r.text();
+  more = r.headers.get("x-has-more") !== "0";
+  page += 1;
+  loading = false;
+}
+load("stream");
+window.addEventListener("wheel", () => load("single"));
+</script>
+</body></html>
+"""
+
+
+def load_recording(root: str):
+    hot_list = b'{"data": {"word_list": []}}'
+    hot_path = os.path.join(root, HOT_LIST_FILE)
+    if os.path.exists(hot_path):
+        with open(hot_path, "rb") as fh:
+            hot_list = fh.read()
+
+    bodies = {}
+    search_root = os.path.join(root, SEARCH_DIR)
+    for name in sorted(os.listdir(search_root)) if os.path.isdir(search_root) else []:
+        directory = os.path.join(search_root, name)
+        files = sorted(f for f in os.listdir(directory) if f.endswith(".bin"))
+        keyword_bodies = []
+        for file in files:
+            with open(os.path.join(directory, file), "rb") as fh:
+                keyword_bodies.append(fh.read())
+        bodies[keyword_from_dir(name)] = keyword_bodies
+    return hot_list, bodies
+
+
+def as_single(raw: bytes, index: int, total: int) -> bytes:
+    items = []
+    for obj in decode_stream(raw):
+        if isinstance(obj, dict) and isinstance(obj.get("data"), list):
+            items.extend(obj["data"])
+    has_more = int(index + 1 < total)
+    return json.dumps(
+        {"status_code": 0, "data": items, "has_more": has_more, "cursor": index + 1},
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def make_app(root: str, latency_ms: float = 0) -> web.Application:
+    hot_list, bodies = load_recording(root)
+    delay = latency_ms / 1000
+    empty = b'{"status_code": 0, "data": [], "has_more": 0}'
+
+    async def homepage(request):
+        resp = web.Response(text="<!doctype html><title>stand-in</title>", content_type="text/html")
+        resp.set_cookie("ttwid", "standin")
+        resp.set_cookie("s_v_web_id", "standin")
+        return resp
+
+    async def hot(request):
+        await asyncio.sleep(delay)
+        return web.Response(body=hot_list, content_type="application/json")
+
+    async def search_page(request):
+        return web.Response(text=SEARCH_PAGE, content_type="text/html")
+
+    def pick(request):
+        keyword = request.query.get("keyword", "")
+        try:
+            index = int(request.query.get("offset", "0"))
+        except ValueError:
+            index = 0
+        sequence = bodies.get(keyword, [])
+        return sequence, index
+
+    async def stream(request):
+        await asyncio.sleep(delay)
+        sequence, index = pick(request)
+        body = sequence[index] if index < len(sequence) else empty
+        more = "1" if index + 1 < len(sequence) else "0"
+        return web.Response(body=body, content_type="application/json", headers={"x-has-more": more})
+
+    async def single(request):
+        await asyncio.sleep(delay)
+        sequence, index = pick(request)
+        body = as_single(sequence[index], index, len(sequence)) if index < len(sequence) else empty
+        more = "1" if index + 1 < len(sequence) else "0"
+        return web.Response(body=body, content_type="application/json", headers={"x-has-more": more})
+
+    async def profile(request):
+        await asyncio.sleep(delay)
+        sec_uid = request.query.get("sec_user_id", "")
+        user = {
+            "sec_uid": sec_uid,
+            "nickname": f"creator {sec_uid[-6:]}",
+            "follower_count": 1000 + len(sec_uid) * 37,
+            "following_count": 100 + len(sec_uid),
+            "signature": f"stand-in profile of {sec_uid}",
+            "custom_verify": "",
+            "enterprise_verify_reason": "stand-in" if sec_uid.endswith("0") else "",
+        }
+        return web.json_response({"status_code": 0, "user": user})
+
+    app = web.Application()
+    app.router.add_get("/", homepage)
+    app.router.add_get("/aweme/v1/web/hot/search/list/", hot)
+    app.router.add_get("/aweme/v1/web/general/search/stream/", stream)
+    app.router.add_get("/aweme/v1/web/general/search/single/", single)
+    app.router.add_get("/aweme/v1/web/user/profile/other/", profile)
+    app.router.add_get("/search/{keyword}", search_page)
+    return app
+
+
+async def start(root: str, port: int = 8765, latency_ms: float = 0) -> web.AppRunner:
+    """Start the stand-in in the running event loop; call ``runner.cleanup()`` to stop."""
+    runner = web.AppRunner(make_app(root, latency_ms))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("record_dir")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    web.run_app(make_app(args.record_dir, args.latency_ms), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
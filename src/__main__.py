@@ -2,4 +2,6 @@ import asyncio
 
 from .main import main
 
-asyncio.run(main())
\ No newline at end of file
+# Guarded so spawned fleet worker processes can import this module safely.
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+from array import array
+from typing import Dict, List
+
+import numpy as np
+
+from .models import AuthorModel, EngagementMetrics, HashtagAggregateModel, VideoModel
+
+
+class KeywordStats:
+    """Engagement columns for one keyword, so videos need not be kept around.
+
+    Only the numbers the aggregates need are kept, in typed arrays, plus one
+    ``AuthorModel`` per distinct creator.
+    """
+
+    def __init__(self):
+        self.likes = array("q")
+        self.comments = array("q")
+        self.shares = array("q")
+        self.views = array("q")
+        self.followers = array("q")
+        self.author_ids: List[str] = []
+        self.authors: Dict[str, AuthorModel] = {}
+        # One (row, name) pair per hashtag occurrence.
+        self.hashtag_rows = array("q")
+        self.hashtag_names: List[str] = []
+
+    @property
+    def videos(self) -> int:
+        return len(self.likes)
+
+    def add(self, video: VideoModel):
+        row = len(self.likes)
+        self.likes.append(video.likes or 0)
+        self.comments.append(video.comments or 0)
+        self.shares.append(video.shares or 0)
+        self.views.append(video.views or 0)
+        author = video.author
+        author_id = author.author_id if author else ""
+        self.followers.append((author.author_followers or 0) if author else 0)
+        self.author_ids.append(author_id)
+        if author_id and author_id not in self.authors:
+            self.authors[author_id] = author
+        for name in {h.hashtag_name for h in video.hashtags or () if h.hashtag_name}:
+            self.hashtag_rows.append(row)
+            self.hashtag_names.append(name)
+
+    def engagement(self) -> EngagementMetrics:
+        likes = int(np.asarray(self.likes, dtype=np.int64).sum())
+        comments = int(np.asarray(self.comments, dtype=np.int64).sum())
+        shares = int(np.asarray(self.shares, dtype=np.int64).sum())
+        return EngagementMetrics(
+            total_likes=likes,
+            total_comments=comments,
+            total_reposts=shares,
+            avg_engagement_rate=round((likes + comments + shares) / max(1, self.videos), 2),
+        )
+
+
+class HashtagAggregator:
+    """Run-wide per-hashtag totals and top creators, computed in one vectorized pass.
+
+    Every keyword's ``KeywordStats`` is added once it is emitted. ``aggregate``
+    concatenates their columns and groups them by hashtag with ``bincount``;
+    a hashtag's top creators are the ``top_k`` authors with the most
+    engagement (likes + comments + shares) on its videos, and its creator
+    followers the summed follower counts of every distinct author using it. A
+    hashtag's heat is that of the hottest keyword it was found under.
+    """
+
+    def __init__(self, top_k: int = 5):
+        self.top_k = top_k
+        self._blocks: List[KeywordStats] = []
+        self._heats: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def add(self, keyword_info: dict, stats: KeywordStats):
+        if not stats.videos:
+            return
+        self._blocks.append(stats)
+        heat = keyword_info.get("heat")
+        self._heats.append(float(heat) if heat is not None else np.nan)
+
+    def reset(self):
+        self._blocks = []
+        self._heats = []
+
+    def _column(self, name: str) -> np.ndarray:
+        return np.concatenate([np.asarray(getattr(b, name), dtype=np.int64) for b in self._blocks])
+
+    def aggregate(self) -> List[HashtagAggregateModel]:
+        if not any(b.hashtag_names for b in self._blocks):
+            return []
+        sizes = np.array([b.videos for b in self._blocks], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        engagement = self._column("likes") + self._column("comments") + self._column("shares")
+        views = self._column("views")
+        followers = self._column("followers")
+        row_heat = np.repeat(np.asarray(self._heats, dtype=np.float64), sizes)
+
+        tag_rows = np.concatenate(
+            [np.asarray(b.hashtag_rows, dtype=np.int64) + offset for b, offset in zip(self._blocks, offsets)]
+        )
+        tag_names, tag_codes = np.unique(
+            np.array([name for b in self._blocks for name in b.hashtag_names]), return_inverse=True
+        )
+        author_ids, author_codes = np.unique(
+            np.array([author_id for b in self._blocks for author_id in b.author_ids]), return_inverse=True
+        )
+        n_tags, n_authors = len(tag_names), len(author_ids)
+
+        tag_engagement = engagement[tag_rows]
+        total_videos = np.bincount(tag_codes, minlength=n_tags)
+        total_views = np.bincount(tag_codes, weights=views[tag_rows], minlength=n_tags)
+        total_engagement = np.bincount(tag_codes, weights=tag_engagement, minlength=n_tags)
+        heat = np.full(n_tags, np.nan)
+        np.fmax.at(heat, tag_codes, row_heat[tag_rows])
+
+        # Engagement per (hashtag, author) pair, then the best top_k pairs of each hashtag.
+        credited = (author_ids != "")[author_codes[tag_rows]]
+        pairs, pair_codes = np.unique(
+            tag_codes[credited] * n_authors + author_codes[tag_rows][credited], return_inverse=True
+        )
+        pair_engagement = np.bincount(pair_codes, weights=tag_engagement[credited])
+        pair_tag, pair_author = pairs // n_authors, pairs % n_authors
+        # An author's latest follower count is as good as any; take the largest seen.
+        author_followers = np.zeros(n_authors, dtype=np.int64)
+        np.maximum.at(author_followers, author_codes, followers)
+        creator_followers = np.bincount(pair_tag, weights=author_followers[pair_author], minlength=n_tags)
+        order = np.lexsort((-pair_engagement, pair_tag))
+        starts = np.searchsorted(pair_tag[order], np.arange(n_tags))
+        rank = np.arange(len(order)) - starts[pair_tag[order]]
+        kept = order[rank < self.top_k]
+
+        authors: Dict[str, AuthorModel] = {}
+        for b in self._blocks:
+            for author_id, author in b.authors.items():
+                authors.setdefault(author_id, author)
+        top_creators: List[List[AuthorModel]] = [[] for _ in range(n_tags)]
+        for tag, author in zip(pair_tag[kept].tolist(), pair_author[kept].tolist()):
+            top_creators[tag].append(authors[author_ids[author]])
+
+        result = []
+        for code in np.argsort(-total_engagement, kind="stable").tolist():
+            videos = int(total_videos[code])
+            result.append(
+                HashtagAggregateModel(
+                    hashtag_name=str(tag_names[code]),
+                    hashtag_heat=None if np.isnan(heat[code]) else float(heat[code]),
+                    total_videos=videos,
+                    total_views=int(total_views[code]),
+                    total_engagement=int(total_engagement[code]),
+                    avg_engagement_rate=round(float(total_engagement[code]) / max(1, videos), 2),
+                    creator_followers=int(creator_followers[code]),
+                    top_creators=top_creators[code],
+                )
+            )
+        return result
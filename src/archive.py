@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+from apify import Actor
+
+INDEX_KEY = "INDEX"
+
+
+def archive_key(prefix: str, keyword: str) -> str:
+    # Key-value store keys are ASCII-only; the keyword itself lives in the index.
+    return f"{prefix}-{hashlib.sha1(keyword.encode('utf-8')).hexdigest()[:16]}"
+
+
+class ChunkArchive:
+    """Opt-in, append-only archive of decoded search API chunks.
+
+    One gzip JSON-lines file per keyword under ``directory``. A keyword starts
+    with a ``{"type": "keyword", ...}`` header line carrying its rank and heat,
+    followed by one ``{"type": "chunk", ...}`` line per decoded API object.
+    Re-opening a file appends a new gzip member, so files accumulate across runs
+    and stay readable with a plain ``gzip.open``.
+    """
+
+    def __init__(self):
+        self.directory: Optional[str] = None
+        self._files: Dict[str, IO[bytes]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def configure(self, directory: Optional[str]):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            Actor.log.info(f"[archive] Archiving decoded API chunks to {directory}")
+
+    def path_for(self, keyword: str) -> str:
+        return os.path.join(self.directory, f"{quote(keyword, safe='')}.jsonl.gz")
+
+    def _write(self, keyword: str, record: dict):
+        fh = self._files.get(keyword)
+        if fh is None:
+            fh = self._files[keyword] = gzip.open(self.path_for(keyword), "ab")
+        fh.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def start_keyword(self, keyword_info: dict):
+        if not self.enabled:
+            return
+        self._write(keyword_info["keyword"], {
+            "type": "keyword",
+            "keyword": keyword_info["keyword"],
+            "rank": keyword_info.get("rank"),
+            "heat": keyword_info.get("heat"),
+            "t": time.time(),
+        })
+
+    def append(self, keyword: str, chunks: List[dict], source: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        for chunk in chunks:
+            self._write(keyword, {"type": "chunk", "source": source, "t": now, "chunk": chunk})
+
+    def close(self):
+        for fh in self._files.values():
+            fh.close()
+        self._files.clear()
+
+    async def upload(self, store_name: str):
+        """Copy every archive file to ``store_name`` and record it in the store's index."""
+        if not self.enabled:
+            return
+        self.close()
+        store = await Actor.open_key_value_store(name=store_name)
+        prefix = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        index = await store.get_value(INDEX_KEY) or []
+
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".jsonl.gz"):
+                continue
+            keyword = unquote(name[: -len(".jsonl.gz")])
+            key = archive_key(prefix, keyword)
+            with open(os.path.join(self.directory, name), "rb") as fh:
+                await store.set_value(key, fh.read(), content_type="application/gzip")
+            index.append({"key": key, "keyword": keyword, "created": prefix})
+
+        await store.set_value(INDEX_KEY, index)
+        Actor.log.info(f"[archive] Uploaded archive to key-value store '{store_name}' (prefix {prefix}).")
+
+
+def iter_archive_lines(fh: IO[bytes]) -> Iterator[dict]:
+    """Stream records from a (multi-member) gzip JSON-lines archive."""
+    with gzip.open(fh, "rb") as gz:
+        for line in gz:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_archive_dir(directory: str) -> Iterator[Tuple[str, Iterator[dict]]]:
+    """Yield ``(keyword, records)`` for every archive file in ``directory``."""
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl.gz"):
+            continue
+        with open(os.path.join(directory, name), "rb") as fh:
+            yield unquote(name[: -len(".jsonl.gz")]), iter_archive_lines(fh)
+
+
+archive = ChunkArchive()
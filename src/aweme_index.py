@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Union
+from .models import VideoModel
+from .records import VideoRecord
+from .utils import parse_douyin_video
+
+
+class AwemeIndex:
+    """Run-wide aweme_id index shared by every ``DouyinScraper``.
+
+    The first keyword to capture an aweme owns it: the video is parsed once and
+    reported under that keyword. Later keywords only record membership, so
+    duplicates neither count toward their limit nor get validated again. Parsed
+    models are kept in a bounded LRU so memory does not grow with the run.
+    """
+
+    def __init__(self, strict: bool = False, parse_cache_size: int = 1024):
+        self.strict = strict
+        self.parse_cache_size = parse_cache_size
+        self.owner: Dict[str, str] = {}
+        self.members: Dict[str, List[str]] = {}
+        self._parsed: "OrderedDict[str, Optional[VideoModel]]" = OrderedDict()
+
+    def add_member(self, aweme_id: str, keyword: str):
+        """Record ``keyword`` as a member of ``aweme_id`` without taking ownership."""
+        keywords = self.members.setdefault(aweme_id, [])
+        if keyword not in keywords:
+            keywords.append(keyword)
+
+    def claim(self, aweme_id: str, keyword: str) -> bool:
+        """Record ``keyword`` as a member of ``aweme_id``; True if it is the first one."""
+        self.add_member(aweme_id, keyword)
+        if aweme_id in self.owner:
+            return self.owner[aweme_id] == keyword
+        self.owner[aweme_id] = keyword
+        return True
+
+    def parse(self, aweme: dict) -> Optional[VideoModel]:
+        """Memoized ``parse_douyin_video``."""
+        aweme_id = aweme.get("aweme_id")
+        if aweme_id is None:
+            return parse_douyin_video(aweme, strict=self.strict)
+        if aweme_id in self._parsed:
+            self._parsed.move_to_end(aweme_id)
+            return self._parsed[aweme_id]
+        parsed = parse_douyin_video(aweme, strict=self.strict)
+        self._parsed[aweme_id] = parsed
+        if len(self._parsed) > self.parse_cache_size:
+            self._parsed.popitem(last=False)
+        return parsed
+
+    def keywords_for(self, aweme_id: str) -> List[str]:
+        return self.members.get(aweme_id, [])
+
+    def __len__(self):
+        return len(self.owner)
+
+
+def dedupe_awemes(
+    awemes: List[Union[dict, VideoModel]],
+    keyword: str,
+    seen: Set[str],
+    index: Optional[AwemeIndex] = None,
+    shared_ids: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    aweme_ids: Optional[List[Optional[str]]] = None,
+) -> List[Union[dict, VideoModel]]:
+    """Drop awemes already seen for this keyword or owned by another keyword.
+
+    ``seen`` is the per-keyword set of aweme_ids and is updated in place. IDs owned
+    by another keyword are appended to ``shared_ids`` so they can be reported by
+    reference. With ``limit``, stops after accepting that many, leaving the rest
+    unseen and unclaimed. ``aweme_ids``, when given, are the ids of ``awemes`` in
+    order (as returned by the decode pool), so the awemes themselves are not read.
+    """
+    accepted = []
+    for i, aweme in enumerate(awemes):
+        if limit is not None and len(accepted) >= limit:
+            break
+        if aweme_ids is not None:
+            aweme_id = aweme_ids[i]
+        elif isinstance(aweme, (VideoModel, VideoRecord)):
+            aweme_id = aweme.video_id
+        else:
+            aweme_id = aweme.get("aweme_id")
+        if aweme_id is None:
+            accepted.append(aweme)
+            continue
+        if aweme_id in seen:
+            continue
+        seen.add(aweme_id)
+        if index is not None and not index.claim(aweme_id, keyword):
+            if shared_ids is not None:
+                shared_ids.append(aweme_id)
+            continue
+        accepted.append(aweme)
+    return accepted
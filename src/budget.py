@@ -0,0 +1,195 @@
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+from apify import Actor
+
+from .metrics import metrics
+from .models import InputModel
+
+
+def heat_weight(heat) -> float:
+    """Dampened weight of a hot-list ``heat`` value (sqrt, so one viral topic cannot take everything)."""
+    try:
+        return math.sqrt(max(float(heat), 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class KeywordPlan:
+    """Video quota and stop rules for one keyword attempt.
+
+    The scroll loop calls ``round`` after every scroll. A keyword stops early
+    once its recent yield drops below ``min_yield`` videos per round, when the
+    run deadline passes, or when its time slice is used up while it yields
+    less than the run average. Productive keywords may run past their slice
+    and ``extend`` their quota with videos other keywords did not need.
+    """
+
+    def __init__(
+        self,
+        keyword: str,
+        limit: int,
+        slice_s: Optional[float] = None,
+        deadline: Optional[float] = None,
+        min_yield: float = 0.0,
+        window: int = 4,
+        budget: Optional["RunBudget"] = None,
+    ):
+        self.keyword = keyword
+        self.limit = limit
+        self.quota = limit
+        self.started = time.time()
+        self.slice_deadline = self.started + slice_s if slice_s else None
+        self.deadline = deadline
+        self.min_yield = min_yield
+        self.window = window
+        self.budget = budget
+        self.rounds = 0
+        self._history: deque = deque(maxlen=window + 1)
+
+    def __getstate__(self):
+        # Fleet workers get a detached copy; they cannot borrow from the parent's reserve.
+        state = self.__dict__.copy()
+        state["budget"] = None
+        return state
+
+    def recent_yield(self) -> Optional[float]:
+        if len(self._history) <= self.window:
+            return None
+        return (self._history[-1] - self._history[0]) / self.window
+
+    def productive(self) -> bool:
+        recent = self.recent_yield()
+        if self.budget is None or recent is None:
+            return False
+        return recent >= max(self.min_yield, self.budget.average_yield())
+
+    def round(self, videos: int) -> Optional[str]:
+        """Record one scroll round with ``videos`` collected so far; returns a reason to stop, if any."""
+        self.rounds += 1
+        self._history.append(videos)
+        now = time.time()
+        if self.deadline is not None and now >= self.deadline:
+            return "run deadline reached"
+        recent = self.recent_yield()
+        if recent is not None and recent < self.min_yield:
+            return f"diminishing returns ({recent:.2f} videos/round)"
+        if self.slice_deadline is not None and now >= self.slice_deadline and not self.productive():
+            return "time slice used"
+        return None
+
+    def extend(self) -> int:
+        """Borrow more quota from the run reserve if this keyword is still productive."""
+        if not self.productive():
+            return 0
+        extra = self.budget.borrow(self.quota)
+        self.limit += extra
+        return extra
+
+
+class RunBudget:
+    """Deadline-aware split of the run's time and video quota across keywords.
+
+    The total quota (``per_keyword`` x keywords) is divided by dampened heat.
+    With a time budget, every keyword attempt gets a slice of the remaining
+    time sized for the remaining keywords, so time freed by keywords that stop
+    early flows to the ones that follow. Quota a keyword did not use goes into
+    a reserve that productive keywords can borrow from.
+    """
+
+    def __init__(
+        self,
+        keywords: List[dict],
+        per_keyword: int,
+        parallelism: int = 1,
+        time_budget_s: Optional[float] = None,
+        heat_weighted: bool = True,
+        min_yield: float = 0.5,
+        max_quota: int = 50,
+    ):
+        self.started = time.time()
+        self.deadline = self.started + time_budget_s if time_budget_s else None
+        self.parallelism = max(1, parallelism)
+        self.min_yield = min_yield
+        self.total_keywords = len(keywords)
+        self.quotas = self.split_quota(keywords, per_keyword, heat_weighted, max_quota)
+        self.reserve = 0
+        self.finished: Set[str] = set()
+        self.total_videos = 0
+        self.total_rounds = 0
+
+    @staticmethod
+    def split_quota(keywords: List[dict], per_keyword: int, heat_weighted: bool, max_quota: int) -> Dict[str, int]:
+        if not heat_weighted or not keywords:
+            return {k["keyword"]: per_keyword for k in keywords}
+        weights = {k["keyword"]: heat_weight(k.get("heat")) for k in keywords}
+        total_weight = sum(weights.values())
+        total = per_keyword * len(keywords)
+        return {
+            keyword: max(1, min(max_quota, round(total * weight / total_weight)))
+            for keyword, weight in weights.items()
+        }
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def average_yield(self) -> float:
+        return self.total_videos / self.total_rounds if self.total_rounds else 0.0
+
+    def plan(self, keyword_info: dict) -> KeywordPlan:
+        keyword = keyword_info["keyword"]
+        slice_s = None
+        if self.deadline is not None:
+            remaining = max(1, self.total_keywords - len(self.finished))
+            slice_s = self.remaining_seconds() * min(self.parallelism, remaining) / remaining
+        return KeywordPlan(
+            keyword,
+            self.quotas.get(keyword, 1),
+            slice_s=slice_s,
+            deadline=self.deadline,
+            min_yield=self.min_yield,
+            budget=self,
+        )
+
+    def borrow(self, wanted: int) -> int:
+        extra = min(wanted, self.reserve)
+        self.reserve -= extra
+        if extra:
+            metrics.inc("quota_borrowed", extra)
+        return extra
+
+    def finish(self, plan: KeywordPlan, videos: int):
+        """Record a keyword attempt; unused quota of a successful one goes to the reserve."""
+        self.total_videos += videos
+        self.total_rounds += plan.rounds
+        if videos > 0 and plan.keyword not in self.finished:
+            self.finished.add(plan.keyword)
+            self.reserve += max(0, plan.limit - videos)
+
+    def log_plan(self):
+        quotas = ", ".join(f"{k}={q}" for k, q in self.quotas.items())
+        deadline = f"{self.remaining_seconds() / 60:.1f} min" if self.deadline else "no time limit"
+        Actor.log.info(f"[budget] {deadline}; video quota per keyword: {quotas}")
+
+
+def budget_for(cfg: InputModel, keywords: List[dict]) -> Optional[RunBudget]:
+    """The run budget the input asks for, or None when neither a time budget nor heat weighting is set."""
+    if not (cfg.time_budget_minutes or cfg.heat_weighted_quota):
+        return None
+    budget = RunBudget(
+        keywords,
+        per_keyword=cfg.max_posts_per_hashtag,
+        parallelism=cfg.concurrency,
+        time_budget_s=cfg.time_budget_minutes * 60 if cfg.time_budget_minutes else None,
+        heat_weighted=cfg.heat_weighted_quota,
+        min_yield=cfg.min_yield_per_round,
+    )
+    budget.log_plan()
+    return budget
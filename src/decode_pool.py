@@ -0,0 +1,155 @@
+import asyncio
+import gzip
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+from apify import Actor
+
+from .metrics import Timing
+from .stream_decoder import StreamDecoder
+from .utils import extract_awemes, parse_douyin_video
+
+
+def decode_response(raw: bytes, keep_raw: bool = False, keep_chunks: bool = False) -> dict:
+    """Decompress, decode and extract the awemes of one captured search API body.
+
+    Runs in a worker thread or process, so it only touches its arguments and
+    returns plain picklable data: the raw aweme dicts and their ``aweme_ids``,
+    plus the flags and next-page cursor the pagination loop needs. Awemes are
+    not parsed here: the scraper dedupes and claims them by id, and only the
+    accepted ones are sent to ``parse_awemes``. The decompressed body and
+    decoded chunks are only sent back when the recorder or archive asks for them.
+    """
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+
+    decoder = StreamDecoder()
+    objs = decoder.feed(raw)
+    objs.extend(decoder.close())
+    chunks = [obj for obj in objs if not (isinstance(obj, dict) and len(obj) == 1 and "ack" in obj)]
+
+    result = {
+        "raw": raw if keep_raw else None,
+        "chunks": chunks if keep_chunks else None,
+        "empty": not chunks,
+        "login_required": False,
+        "has_more": None,
+        "cursor": None,
+        "awemes": [],
+        "aweme_ids": [],
+        "bytes_decoded": decoder.bytes_decoded,
+        "chunks_parsed": decoder.objects_parsed,
+        "chunks_dropped": decoder.segments_dropped,
+    }
+
+    for chunk in chunks:
+        if not isinstance(chunk, dict):
+            continue
+        if chunk.get("search_nil_info", {}).get("search_nil_type") == "web_need_login":
+            result["login_required"] = True
+            break
+        for aweme in extract_awemes(chunk):
+            result["awemes"].append(aweme)
+            result["aweme_ids"].append(aweme.get("aweme_id"))
+        if "has_more" in chunk:
+            result["has_more"] = bool(chunk["has_more"])
+        if isinstance(chunk.get("cursor"), int):
+            result["cursor"] = chunk["cursor"]
+
+    return result
+
+
+def parse_awemes(awemes: List[dict], strict: bool = False) -> dict:
+    """Parse accepted awemes into records, in a worker like ``decode_response``.
+
+    Only the parsed records come back, with the per-aweme ``parse_aweme``
+    timing in the form ``Metrics.merge`` takes.
+    """
+    timing = Timing()
+    videos = []
+    for aweme in awemes:
+        started = time.perf_counter()
+        video = parse_douyin_video(aweme, strict=strict)
+        timing.observe(time.perf_counter() - started)
+        if video is not None:
+            videos.append(video)
+    timings = {"parse_aweme": (timing.count, timing.total, timing.min, timing.max)} if timing.count else {}
+    return {"videos": videos, "timings": timings}
+
+
+def _executor(kind: str, workers: int, name: str) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+
+class DecodePool:
+    """Bounded executors for response decoding and parsing, shared by every scraper of a run.
+
+    ``max_in_flight`` caps how many bodies can be queued or decoding at once;
+    further responses wait on the semaphore before their body is even read, so
+    a slow pool applies backpressure instead of piling bodies up in memory.
+    Parsing is pure Python and holds the GIL, so it defaults to a process pool
+    to use more than one core; decoding spends most of its time in zlib and
+    the C JSON scanner and is fine on threads. With ``workers=0`` both run
+    inline on the event loop.
+    """
+
+    def __init__(self):
+        self.executor: Optional[Executor] = None
+        self.parse_executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def configure(
+        self,
+        workers: int = 2,
+        kind: str = "thread",
+        parse_kind: str = "process",
+        max_in_flight: Optional[int] = None,
+    ):
+        self.close()
+        if workers <= 0:
+            return
+        self.executor = _executor(kind, workers, "decode")
+        self.parse_executor = self.executor if parse_kind == kind else _executor(parse_kind, workers, "parse")
+        self._semaphore = asyncio.Semaphore(max_in_flight or workers * 2)
+        Actor.log.info(f"[decode] Decoding responses on {workers} {kind} workers, parsing on {parse_kind} workers.")
+
+    def slot(self):
+        """Async context manager bounding in-flight decodes (no-op when inline)."""
+        return self._semaphore if self._semaphore is not None else _NullSlot()
+
+    async def decode(self, raw: bytes, **kwargs) -> dict:
+        if self.executor is None:
+            return decode_response(raw, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _call_decode, raw, kwargs)
+
+    async def parse(self, awemes: List[dict], strict: bool = False) -> dict:
+        if self.parse_executor is None or not awemes:
+            return parse_awemes(awemes, strict=strict)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.parse_executor, parse_awemes, awemes, strict)
+
+    def close(self):
+        for executor in {self.executor, self.parse_executor}:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.parse_executor = None
+        self._semaphore = None
+
+
+def _call_decode(raw: bytes, kwargs: dict) -> dict:
+    return decode_response(raw, **kwargs)
+
+
+class _NullSlot:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+decode_pool = DecodePool()
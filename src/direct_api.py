@@ -0,0 +1,186 @@
+import json
+import os
+from typing import Callable, List, Optional
+from urllib.parse import quote
+
+import aiohttp
+from apify import Actor
+
+from .archive import archive
+from .metrics import metrics
+from .recorder import recorder
+from .scraper import DouyinScraper
+from .utils import DOUYIN_BASE_URL
+
+DOUYIN_SEARCH_API = f"{DOUYIN_BASE_URL}/aweme/v1/web/general/search/single/"
+
+SEARCH_PARAMS = {
+    "device_platform": "webapp",
+    "aid": "6383",
+    "channel": "channel_pc_web",
+    "search_channel": "aweme_general",
+    "search_source": "normal_search",
+    "query_correct_type": "1",
+    "is_filter_search": "0",
+    "pc_client_type": "1",
+    "version_code": "190600",
+    "version_name": "19.6.0",
+    "cookie_enabled": "true",
+    "screen_width": "1280",
+    "screen_height": "800",
+    "browser_language": "zh-CN",
+    "browser_platform": "Win32",
+    "browser_name": "Chrome",
+    "browser_version": "122.0.0.0",
+    "browser_online": "true",
+    "engine_name": "Blink",
+    "engine_version": "122.0.0.0",
+    "os_name": "Windows",
+    "os_version": "10",
+    "platform": "PC",
+}
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+
+def load_storage_cookies(state_path: str, domain: str = "douyin.com") -> dict:
+    """Read the cookies for ``domain`` from a Playwright storage state file."""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r", encoding="utf-8") as fh:
+        state = json.load(fh)
+    return {
+        c["name"]: c["value"]
+        for c in state.get("cookies", [])
+        if domain in c.get("domain", "")
+    }
+
+
+class DirectSearchClient:
+    """Browserless client for the Douyin general search API.
+
+    Reuses the cookies saved by the Playwright session and follows the
+    ``cursor`` / ``has_more`` pagination of ``/general/search/single/``.
+    ``search`` returns ``None`` whenever the response looks like a login wall
+    or a rejected signature so the caller can fall back to ``DouyinScraper``.
+    """
+
+    def __init__(
+        self,
+        state_path: str = "douyin_storage_state.json",
+        api_url: str = DOUYIN_SEARCH_API,
+        page_size: int = 10,
+        max_requests: int = 10,
+        timeout: float = 20,
+    ):
+        self.state_path = state_path
+        self.api_url = api_url
+        self.page_size = page_size
+        self.max_requests = max_requests
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self):
+        cookies = load_storage_cookies(self.state_path)
+        Actor.log.info(f"[direct] Loaded {len(cookies)} session cookies from {self.state_path}.")
+        self.session = aiohttp.ClientSession(
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "application/json, text/plain, */*",
+                "Accept-Language": "zh-CN,zh;q=0.9",
+            },
+            cookies=cookies,
+            timeout=self.timeout,
+        )
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def search(
+        self,
+        keyword: str,
+        limit: int,
+        accept: Optional[Callable[[List[dict]], List[dict]]] = None,
+    ) -> Optional[List[dict]]:
+        """Return up to ``limit`` raw aweme dicts, or ``None`` if the browser is needed.
+
+        ``accept`` filters each page before it counts toward ``limit`` (see
+        ``DouyinScraper.accept_videos``).
+        """
+        videos: List[dict] = []
+        seen_any = False
+        offset = 0
+
+        for _ in range(self.max_requests):
+            params = {
+                **SEARCH_PARAMS,
+                "keyword": keyword,
+                "offset": str(offset),
+                "count": str(min(self.page_size, limit - len(videos))),
+            }
+            headers = {"Referer": f"{DOUYIN_BASE_URL}/search/{quote(keyword)}"}
+
+            try:
+                with metrics.time("direct_request"):
+                    async with self.session.get(self.api_url, params=params, headers=headers) as resp:
+                        if resp.status != 200:
+                            Actor.log.warning(f"[direct] HTTP {resp.status} for '{keyword}' — falling back.")
+                            return None
+                        raw = await resp.read()
+                recorder.record_search(keyword, self.api_url, raw)
+            except Exception as e:
+                Actor.log.warning(f"[direct] Request failed for '{keyword}': {e} — falling back.")
+                return None
+
+            chunks = DouyinScraper.extract_json_chunks(raw)
+            archive.append(keyword, chunks, source="direct")
+            if not chunks:
+                # A rejected signature comes back as an empty 200 body.
+                Actor.log.warning(f"[direct] Empty or non-JSON body for '{keyword}' — falling back.")
+                return None
+
+            # Like on_response, look for the login wall in every chunk, not just the first.
+            if any(
+                isinstance(chunk, dict)
+                and chunk.get("search_nil_info", {}).get("search_nil_type") == "web_need_login"
+                for chunk in chunks
+            ):
+                Actor.log.warning(f"[direct] web_need_login for '{keyword}' — falling back.")
+                return None
+            body = chunks[0] if isinstance(chunks[0], dict) else {}
+            if body.get("status_code", 0) != 0:
+                Actor.log.warning(
+                    f"[direct] status_code={body.get('status_code')} for '{keyword}' — falling back."
+                )
+                return None
+
+            for chunk in chunks:
+                found = DouyinScraper.extract_videos_from_obj(chunk)
+                seen_any = seen_any or bool(found)
+                videos.extend(accept(found) if accept else found)
+
+            Actor.log.info(f"[direct] '{keyword}': {len(videos)} videos after offset {offset}.")
+            if len(videos) >= limit or not body.get("has_more"):
+                break
+
+            next_offset = body.get("cursor")
+            if not isinstance(next_offset, int) or next_offset <= offset:
+                break
+            offset = next_offset
+
+        if not seen_any:
+            return None
+        return videos[:limit]
@@ -0,0 +1,357 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from apify import Actor
+
+from .aweme_index import AwemeIndex, dedupe_awemes
+from .budget import RunBudget
+from .archive import archive
+from .decode_pool import decode_pool
+from .direct_api import DirectSearchClient, DOUYIN_SEARCH_API
+from .metrics import metrics
+from .models import InputModel
+from .output import DatasetWriter
+from .pipeline import RunState, collect_keyword, emit_keyword
+from .recorder import recorder
+from .resource_filter import ResourceFilter
+from .retry import EMPTY, RetryScheduler, classify_failure
+from .session import BrowserSession, pool_state_path, pool_stores
+
+
+def worker_state_path(state_path: str, worker_id: int) -> str:
+    root, ext = os.path.splitext(state_path)
+    return f"{root}.worker{worker_id}{ext}"
+
+
+def _worker_main(
+    worker_id: int, cfg_data: dict, state_path: str, saved_at: List[Optional[float]], slots: int, inbox, results
+):
+    """Entry point of a fleet worker process (spawned, so it starts from a clean interpreter)."""
+    logging.basicConfig(level=logging.INFO, format=f"[fleet {worker_id}] %(levelname)s %(message)s")
+    asyncio.run(_worker_loop(worker_id, InputModel(**cfg_data), state_path, saved_at, slots, inbox, results))
+
+
+async def _worker_loop(
+    worker_id: int, cfg: InputModel, state_path: str, saved_at: List[Optional[float]], slots: int, inbox, results
+):
+    stores = pool_stores(state_path, cfg.session_pool_size, store_name=None, max_age_hours=cfg.session_max_age_hours)
+    for store, stored_at in zip(stores, saved_at):
+        store.saved_at = stored_at
+    resource_filter = None
+    if cfg.block_resources:
+        resource_filter = ResourceFilter(
+            blocked_resource_types=cfg.blocked_resource_types,
+            blocked_url_patterns=cfg.blocked_url_patterns,
+            allowed_url_patterns=cfg.allowed_url_patterns,
+        )
+    # Duplicates within this worker are dropped here; the parent dedupes across workers.
+    run = RunState(
+        cfg=cfg,
+        browser=BrowserSession(
+            stores,
+            resource_filter=resource_filter,
+            recycle_after=cfg.browser_recycle_keywords,
+            memory_limit_mb=cfg.browser_memory_limit_mb,
+        ),
+        writer=None,
+        aweme_index=AwemeIndex(strict=cfg.strict_validation),
+    )
+    # Workers are daemonic and cannot own a process pool of their own.
+    decode_pool.configure(workers=cfg.decode_workers, kind="thread", parse_kind="thread")
+    if cfg.direct_api and os.path.exists(state_path):
+        run.direct_client = DirectSearchClient(state_path=state_path, api_url=cfg.direct_api_url or DOUYIN_SEARCH_API)
+        await run.direct_client.open()
+
+    loop = asyncio.get_running_loop()
+
+    async def slot(slot_id: int):
+        await asyncio.sleep(slot_id * 1.5)
+        while True:
+            results.put(("ready", worker_id))
+            task = await loop.run_in_executor(None, inbox.get)
+            if task is None:
+                return
+            keyword_info, attempt, plan = task
+
+            videos = None
+            shared_ids: List[str] = []
+            failure = None
+            try:
+                # A retry goes straight to the browser; the direct path already failed.
+                collected, shared_ids = await collect_keyword(
+                    run, keyword_info, log_prefix=f"[slot {slot_id}] ", use_direct=attempt == 1, plan=plan
+                )
+                videos = list(collected)
+            except Exception as e:
+                failure = classify_failure(e)
+                Actor.log.warning(f"[slot {slot_id}] Failed scraping '{keyword_info['keyword']}': {e}")
+            results.put(("result", worker_id, keyword_info, videos, shared_ids, failure, plan, metrics.drain()))
+
+            await asyncio.sleep(3 + (keyword_info["rank"] % 3))
+
+    try:
+        await asyncio.gather(*(slot(i) for i in range(slots)))
+    finally:
+        if run.direct_client:
+            await run.direct_client.close()
+        await run.browser.close()
+        decode_pool.close()
+        results.put(("exit", worker_id, metrics.drain()))
+
+
+class BrowserFleet:
+    """K worker processes, each with its own Chromium, context and storage state.
+
+    The parent hands keywords out one at a time to whichever worker reports a
+    free slot, so it always knows which keywords a worker holds. Workers send
+    parsed ``VideoModel`` lists back; the parent dedupes them against the
+    run-wide ``AwemeIndex`` and is the only process that writes to the dataset.
+    When a worker dies, its in-flight keywords are requeued (up to
+    ``max_attempts`` times each) and the worker is restarted. Keywords that
+    fail are requeued after the ``RetryScheduler`` backoff for their failure
+    type, while the rest of the queue keeps flowing.
+    """
+
+    def __init__(
+        self,
+        cfg: InputModel,
+        processes: int,
+        state_path: str,
+        saved_at: Optional[List[Optional[float]]] = None,
+        max_attempts: int = 2,
+        retries: Optional[RetryScheduler] = None,
+        budget: Optional[RunBudget] = None,
+    ):
+        self.cfg = cfg
+        self.processes = processes
+        self.state_path = state_path
+        self.saved_at = saved_at or []
+        self.max_attempts = max_attempts
+        self.retries = retries or RetryScheduler()
+        self.budget = budget
+        self.max_restarts = processes * 2
+        # Split the page budget across processes; each process runs at least one page.
+        self.slots = max(1, cfg.concurrency // processes)
+
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._procs: Dict[int, mp.process.BaseProcess] = {}
+        self._inboxes: Dict[int, "mp.Queue"] = {}
+        self._free: Dict[int, int] = {}
+        self._assigned: Dict[int, List[dict]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._tries: Dict[str, int] = {}
+        self._restarts = 0
+
+        self._pending: Deque[dict] = deque()
+        self._delayed: List[Tuple[float, int, dict]] = []
+        self._sequence = itertools.count()
+        self._done: Set[str] = set()
+        self._failed: List[dict] = []
+        self._writer: Optional[DatasetWriter] = None
+        self._aweme_index: Optional[AwemeIndex] = None
+
+        if recorder.enabled or archive.enabled:
+            Actor.log.warning("[fleet] record_dir / archive_dir only cover keywords scraped in the main process.")
+
+    def _spawn(self, worker_id: int):
+        path = worker_state_path(self.state_path, worker_id)
+        # Start each pooled session of the worker from the parent's copy when it is fresh.
+        saved_at = []
+        for index, stored_at in enumerate(self.saved_at):
+            source = pool_state_path(self.state_path, index)
+            if stored_at is not None and os.path.exists(source):
+                shutil.copyfile(source, pool_state_path(path, index))
+                saved_at.append(stored_at)
+            else:
+                saved_at.append(None)
+
+        inbox = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.cfg.model_dump(), path, saved_at, self.slots, inbox, self._results),
+            name=f"douyin-fleet-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+        self._procs[worker_id] = proc
+        self._inboxes[worker_id] = inbox
+        self._free[worker_id] = 0
+        self._assigned[worker_id] = []
+
+    def _next_message(self, timeout: float):
+        try:
+            if timeout <= 0:
+                return self._results.get_nowait()
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def _handle(self, message: tuple):
+        kind, worker_id = message[0], message[1]
+        if kind == "ready":
+            if worker_id in self._free:
+                self._free[worker_id] += 1
+            return
+        if kind == "exit":
+            metrics.merge(message[2])
+            return
+
+        _, _, keyword_info, videos, shared_ids, failure, plan, snapshot = message
+        metrics.merge(snapshot)
+        if self.budget and plan:
+            # The worker's copy of the plan carries the scroll rounds it used.
+            self.budget.finish(plan, len(videos or []))
+        keyword = keyword_info["keyword"]
+        held = self._assigned.get(worker_id, [])
+        self._assigned[worker_id] = [k for k in held if k["keyword"] != keyword]
+        if keyword in self._done:
+            return
+
+        if failure is not None:
+            self._retry_later(keyword_info, failure)
+            return
+
+        # The worker reported these as owned by another of its keywords; that
+        # keyword may not have reached the parent yet, so do not claim them.
+        for aweme_id in shared_ids:
+            self._aweme_index.add_member(aweme_id, keyword)
+        shared = list(shared_ids)
+        accepted = dedupe_awemes(videos, keyword, set(), self._aweme_index, shared)
+        ok = await emit_keyword(self._writer, keyword_info, accepted, shared, log_prefix=f"[fleet {worker_id}] ")
+        if ok:
+            self._done.add(keyword)
+        else:
+            self._retry_later(keyword_info, EMPTY)
+
+    def _retry_later(self, keyword_info: dict, failure: str):
+        keyword = keyword_info["keyword"]
+        tries = self._tries[keyword] = self._tries.get(keyword, 0) + 1
+        delay = self.retries.delay(failure, tries)
+        if delay is None:
+            Actor.log.warning(f"[fleet] Giving up on '{keyword}' ({failure}) after {tries} attempts.")
+            self._done.add(keyword)
+            self._failed.append(keyword_info)
+            return
+        Actor.log.info(f"[fleet] Retrying '{keyword}' ({failure}) in {delay:.1f}s.")
+        heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), keyword_info))
+
+    def _release_due(self):
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._pending.append(heapq.heappop(self._delayed)[2])
+
+    async def _reap(self):
+        dead = [worker_id for worker_id, proc in self._procs.items() if not proc.is_alive()]
+        if not dead:
+            return
+
+        # Results a worker sent before it died are still in the pipe; handle them first.
+        while (message := self._next_message(0)) is not None:
+            await self._handle(message)
+
+        for worker_id in dead:
+            proc = self._procs.pop(worker_id)
+            lost = [k for k in self._assigned.pop(worker_id, []) if k["keyword"] not in self._done]
+            self._free.pop(worker_id, None)
+            self._inboxes.pop(worker_id).close()
+            metrics.inc("fleet_worker_crashes")
+            Actor.log.warning(
+                f"[fleet] Worker {worker_id} exited with code {proc.exitcode}; requeueing {len(lost)} keywords."
+            )
+
+            for keyword_info in reversed(lost):
+                keyword = keyword_info["keyword"]
+                self._attempts[keyword] = self._attempts.get(keyword, 0) + 1
+                if self._attempts[keyword] >= self.max_attempts:
+                    Actor.log.warning(f"[fleet] Giving up on '{keyword}' after {self._attempts[keyword]} crashes.")
+                    self._done.add(keyword)
+                    self._failed.append(keyword_info)
+                else:
+                    metrics.inc("fleet_keywords_requeued")
+                    self._pending.appendleft(keyword_info)
+
+            if (self._pending or self._delayed) and self._restarts < self.max_restarts:
+                self._restarts += 1
+                Actor.log.info(f"[fleet] Restarting worker {worker_id} ({self._restarts}/{self.max_restarts}).")
+                self._spawn(worker_id)
+
+    def _dispatch(self):
+        if self.budget and self.budget.expired and (self._pending or self._delayed):
+            skipped = len(self._pending) + len(self._delayed)
+            Actor.log.info(f"[budget] Run deadline reached — skipping {skipped} keywords.")
+            metrics.inc("keywords_skipped_deadline", skipped)
+            self._pending.clear()
+            self._delayed.clear()
+        for worker_id, inbox in self._inboxes.items():
+            while self._free[worker_id] > 0 and self._pending:
+                keyword_info = self._pending.popleft()
+                if keyword_info["keyword"] in self._done:
+                    continue
+                plan = self.budget.plan(keyword_info) if self.budget else None
+                self._free[worker_id] -= 1
+                self._assigned[worker_id].append(keyword_info)
+                inbox.put((keyword_info, self._tries.get(keyword_info["keyword"], 0) + 1, plan))
+
+    async def run(self, keywords: list, writer: DatasetWriter, aweme_index: AwemeIndex) -> list:
+        """Scrape ``keywords`` across the fleet. Returns the keywords that still failed after retrying."""
+        self._pending = deque(keywords)
+        self._writer = writer
+        self._aweme_index = aweme_index
+        Actor.log.info(
+            f"[fleet] Scraping {len(keywords)} keywords with {self.processes} browser processes "
+            f"x {self.slots} pages."
+        )
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending or self._delayed or any(self._assigned.values()):
+                message = await loop.run_in_executor(None, self._next_message, 1.0)
+                if message is not None:
+                    await self._handle(message)
+                await self._reap()
+                if not self._procs:
+                    self._failed.extend(self._pending)
+                    self._failed.extend(item[2] for item in self._delayed)
+                    Actor.log.error(f"[fleet] No workers left; {len(self._failed)} keywords not scraped.")
+                    self._pending.clear()
+                    self._delayed.clear()
+                    break
+                self._release_due()
+                self._dispatch()
+        finally:
+            await self._shutdown()
+        return self._failed
+
+    async def _shutdown(self, timeout: float = 60):
+        for inbox in self._inboxes.values():
+            for _ in range(self.slots):
+                inbox.put(None)
+
+        loop = asyncio.get_running_loop()
+        live = set(self._procs)
+        deadline = time.monotonic() + timeout
+        while live and time.monotonic() < deadline:
+            message = await loop.run_in_executor(None, self._next_message, 1.0)
+            if message is None:
+                live = {worker_id for worker_id in live if self._procs[worker_id].is_alive()}
+            elif message[0] == "exit":
+                metrics.merge(message[2])
+                live.discard(message[1])
+
+        for proc in self._procs.values():
+            await loop.run_in_executor(None, proc.join, 5)
+            if proc.is_alive():
+                proc.terminate()
+        self._results.close()
+        Actor.log.info("[fleet] All worker processes stopped.")
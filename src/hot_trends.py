@@ -1,7 +1,15 @@
+import asyncio
+import json
+
 import aiohttp
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+from .metrics import metrics
+from .recorder import recorder
+from .utils import DOUYIN_BASE_URL
 
 DOUYIN_HOT_API = (
-    "https://www.douyin.com/aweme/v1/web/hot/search/list/"
+    f"{DOUYIN_BASE_URL}/aweme/v1/web/hot/search/list/"
     "?device_platform=webapp&aid=6383&channel=channel_pc_web&detail_list=1"
     "&count=50&pc_client_type=1&version_code=190600&version_name=19.6.0"
     "&cookie_enabled=true&screen_width=1920&screen_height=1080"
@@ -11,6 +19,33 @@ DOUYIN_HOT_API = (
     "&os_name=Windows&os_version=10&device_memory=8&platform=PC"
 )
 
+
+class HotListUnavailable(Exception):
+    """The hot list answered, but not with usable trending items."""
+
+
+async def _fetch_hot_items(headers: dict) -> list:
+    with metrics.time("hot_list"):
+        async with aiohttp.ClientSession(headers=headers) as session:
+            async with session.get(DOUYIN_HOT_API, timeout=30) as resp:
+                print(f"[douyin] Status: {resp.status} | Content-Type: {resp.headers.get('Content-Type')}")
+                if resp.status != 200:
+                    raise HotListUnavailable(f"HTTP {resp.status}")
+                raw = await resp.read()
+
+    recorder.record_hot_list(raw)
+    data = json.loads(raw)
+
+    data = data.get("data", {})
+    trending_list = data.get("trending_list", [])
+    word_list = data.get("word_list", [])
+    all_items = trending_list + word_list
+
+    if not all_items:
+        raise HotListUnavailable("no trending items in response")
+    return all_items
+
+
 async def fetch_hot_hashtags(limit: int = 10):
     """Fetch trending Douyin hashtags directly from the official hot search API."""
     print("[apify] INFO  Fetching trending hashtags via Douyin hot search API...")
@@ -21,26 +56,26 @@ async def fetch_hot_hashtags(limit: int = 10):
             "AppleWebKit/537.36 (KHTML, like Gecko) "
             "Chrome/142.0.0.0 Safari/537.36"
         ),
-        "Referer": "https://www.douyin.com/hot",
+        "Referer": f"{DOUYIN_BASE_URL}/hot",
         "Accept": "application/json, text/plain, */*",
         "Accept-Language": "zh-CN,zh;q=0.9",
     }
 
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(DOUYIN_HOT_API, timeout=30) as resp:
-            print(f"[douyin] Status: {resp.status} | Content-Type: {resp.headers.get('Content-Type')}")
-            if resp.status != 200:
-                print("[WARN] Non-200 response; unable to fetch Douyin hot list.")
-                return []
-            data = await resp.json(content_type=None)
-
-    data = data.get("data", {})
-    trending_list = data.get("trending_list", [])
-    word_list = data.get("word_list", [])
-    all_items = trending_list + word_list
-
-    if not all_items:
-        print("[WARN] No trending items found in Douyin API response.")
+    try:
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError, ValueError, HotListUnavailable)),
+            stop=stop_after_attempt(4),
+            wait=wait_exponential_jitter(initial=2, max=30, jitter=2),
+            before_sleep=lambda state: print(
+                f"[WARN] Hot list attempt {state.attempt_number} failed ({state.outcome.exception()}); "
+                f"retrying in {state.next_action.sleep:.1f}s."
+            ),
+            reraise=True,
+        ):
+            with attempt:
+                all_items = await _fetch_hot_items(headers)
+    except Exception as e:
+        print(f"[WARN] Unable to fetch Douyin hot list: {e}")
         return []
 
     trends = []
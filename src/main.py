@@ -1,12 +1,27 @@
 import asyncio
 import sys
-import os
 from apify import Actor
-from playwright.async_api import async_playwright
 
-from .models import InputModel, DouyinTrend, EngagementMetrics
-from .scraper import DouyinScraper
+from .models import InputModel
 from .hot_trends import fetch_hot_hashtags
+from .resource_filter import ResourceFilter
+from .direct_api import DirectSearchClient, DOUYIN_SEARCH_API
+from .aweme_index import AwemeIndex
+from .output import writer_for
+from .metrics import metrics
+from .recorder import recorder
+from .archive import archive
+from .parquet_export import parquet_export
+from .decode_pool import decode_pool
+from .trend_store import trend_store
+from .profiles import author_enricher
+from .reparse import reparse_store
+from .session import BrowserSession, ColdStartTimer, pool_stores
+from .pipeline import RunState, scrape_keywords
+from .retry import RetryScheduler
+from .budget import budget_for
+from .watch import watch
+from .fleet import BrowserFleet
 
 sys.stdout.reconfigure(encoding="utf-8")
 
@@ -14,191 +29,137 @@ sys.stdout.reconfigure(encoding="utf-8")
 async def main():
     """Main entrypoint for Douyin trending scraper actor with persistent browser session."""
     async with Actor:
+        timer = ColdStartTimer()
         input_data = await Actor.get_input() or {}
         cfg = InputModel(**input_data)
 
+        recorder.configure(cfg.record_dir)
+        archive.configure(cfg.archive_dir)
+        parquet_export.configure(cfg.parquet_dir)
+        decode_pool.configure(workers=cfg.decode_workers, kind=cfg.decode_executor, parse_kind=cfg.parse_executor)
+        trend_store.configure(cfg.trend_store_name if cfg.trend_history else None, cfg.trend_retention_days)
+
+        if cfg.reparse_archive is not None:
+            Actor.log.info(f"Reparsing archived chunks with prefix '{cfg.reparse_archive}' — no scraping.")
+            writer = writer_for(cfg)
+            await reparse_store(cfg.archive_store_name, cfg.reparse_archive, writer, strict=cfg.strict_validation)
+            await parquet_export.upload(cfg.parquet_store_name)
+            await metrics.save(prometheus=cfg.metrics_prometheus)
+            return
+
         Actor.log.info("Starting Douyin Trending Video Scraper")
         Actor.log.info(f"Max keywords: {getattr(cfg, 'max_hashtags', 3)}")
         Actor.log.info(f"Max videos per keyword: {getattr(cfg, 'max_posts_per_hashtag', 10)}")
 
+        state_path = "douyin_storage_state.json"
+        stores = pool_stores(
+            state_path,
+            cfg.session_pool_size,
+            store_name=cfg.session_store_name,
+            max_age_hours=cfg.session_max_age_hours,
+        )
+        # Restore the sessions and trend history while the hot list is fetched.
+        restore = asyncio.gather(*(store.load() for store in stores), trend_store.load())
+
         Actor.log.info("Fetching trending keywords from Douyin hot list…")
         trending_keywords = await fetch_hot_hashtags(limit=getattr(cfg, "max_hashtags", 3))
         Actor.log.info(f"Found {len(trending_keywords)} trending topics.")
         for i, kw in enumerate(trending_keywords, start=1):
             kw["rank"] = kw.get("rank", i)
             Actor.log.info(f"#{kw['rank']}: {kw['keyword']} (heat={kw.get('heat')})")
+        await restore
+
+        resource_filter = None
+        if getattr(cfg, "block_resources", True):
+            resource_filter = ResourceFilter(
+                blocked_resource_types=cfg.blocked_resource_types,
+                blocked_url_patterns=cfg.blocked_url_patterns,
+                allowed_url_patterns=cfg.allowed_url_patterns,
+            )
 
-        all_results = []
-        failed_keywords = []
-        state_path = "douyin_storage_state.json"
-
-        async with async_playwright() as p:
-            Actor.log.info("[session] Launching single persistent Chromium browser…")
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-infobars",
-                    "--disable-web-security",
-                    "--no-sandbox",
-                    "--disable-gpu",
-                ],
+        run = RunState(
+            cfg=cfg,
+            browser=BrowserSession(
+                stores,
+                resource_filter=resource_filter,
+                recycle_after=cfg.browser_recycle_keywords,
+                memory_limit_mb=cfg.browser_memory_limit_mb,
+            ),
+            writer=writer_for(cfg),
+            aweme_index=AwemeIndex(strict=cfg.strict_validation),
+            timer=timer,
+            retries=RetryScheduler(budget=cfg.retry_budget),
+        )
+
+        if getattr(cfg, "direct_api", False):
+            if not stores[0].fresh:
+                # The direct client needs current cookies; a missing, stale or
+                # invalidated state gets a browser warm-up first.
+                await run.browser.prepare()
+            run.direct_client = DirectSearchClient(
+                state_path=state_path,
+                api_url=cfg.direct_api_url or DOUYIN_SEARCH_API,
             )
+            await run.direct_client.open()
+
+        if cfg.enrich_authors:
+            if not stores[0].fresh:
+                await run.browser.prepare()
+            author_enricher.configure(
+                cfg.profile_store_name,
+                api_url=cfg.profile_api_url,
+                concurrency=cfg.profile_concurrency,
+                cache_size=cfg.profile_cache_size,
+                cache_hours=cfg.profile_cache_hours,
+            )
+            await author_enricher.open(state_path)
 
-            if os.path.exists(state_path):
-                Actor.log.info("[session] Found existing storage state — reusing cookies.")
-                context = await browser.new_context(
-                    storage_state=state_path,
-                    user_agent=(
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/122.0.0.0 Safari/537.36"
-                    ),
-                    locale="zh-CN",
-                    viewport={"width": 1280, "height": 800},
-                )
+        try:
+            if cfg.watch_interval_minutes:
+                await watch(run, trending_keywords)
             else:
-                Actor.log.info("[session] No storage state found — creating fresh context.")
-                context = await browser.new_context(
-                    user_agent=(
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/122.0.0.0 Safari/537.36"
-                    ),
-                    locale="zh-CN",
-                    viewport={"width": 1280, "height": 800},
-                )
-
-                warm = await context.new_page()
-                Actor.log.info("[session] Warming up Douyin homepage to establish cookies…")
-                try:
-                    await warm.goto("https://www.douyin.com", wait_until="domcontentloaded", timeout=60000)
-                    await asyncio.sleep(5)
-                except Exception as e:
-                    Actor.log.warning(f"[session] Warm-up failed: {e}")
-                await warm.close()
-                await context.storage_state(path=state_path)
-                Actor.log.info("[session] Storage state saved for reuse.")
-
-            for keyword_info in trending_keywords:
-                keyword = keyword_info["keyword"]
-                rank = keyword_info["rank"]
-
-                Actor.log.info(f"Scraping videos for '{keyword}' (rank {rank})")
-
-                scraper = DouyinScraper(
-                    keyword=keyword,
-                    limit=getattr(cfg, "max_posts_per_hashtag", 10),
-                    shared_context=context,
-                )
-
-                raw_data = await scraper.fetch_json()
-                if not raw_data:
-                    Actor.log.warning(f"No data for {keyword}")
-                    failed_keywords.append(keyword_info)
-                    continue
-
-                structured = await scraper.extract_posts(raw_data)
-                videos = structured.videos
-                Actor.log.info(f"Collected {len(videos)} structured videos for '{keyword}'")
-
-                if len(videos) == 0:
-                    failed_keywords.append(keyword_info)
-                    continue
-
-                total_likes = sum(v.likes or 0 for v in videos)
-                total_comments = sum(v.comments or 0 for v in videos)
-                total_shares = sum(v.shares or 0 for v in videos)
-                avg_engagement_rate = round(
-                    sum((v.likes or 0) + (v.comments or 0) + (v.shares or 0) for v in videos)
-                    / max(1, len(videos)),
-                    2,
-                )
-
-                engagement = EngagementMetrics(
-                    total_likes=total_likes,
-                    total_comments=total_comments,
-                    total_reposts=total_shares,
-                    avg_engagement_rate=avg_engagement_rate,
-                )
-
-                trend_data = DouyinTrend(
-                    keyword=keyword,
-                    rank=rank,
-                    heat=keyword_info.get("heat"),
-                    total_videos=len(videos),
-                    engagement_metrics=engagement,
-                    videos=videos,
-                )
-
-                await Actor.push_data(trend_data.model_dump())
-                all_results.append(trend_data.model_dump())
-
-                await asyncio.sleep(3 + (rank % 3))
-
-            if failed_keywords:
-                Actor.log.info(f"[retry] Retrying {len(failed_keywords)} failed keywords after short delay...")
-                await asyncio.sleep(30)
-                for keyword_info in failed_keywords:
-                    keyword = keyword_info["keyword"]
-                    rank = keyword_info["rank"]
-
-                    Actor.log.info(f"[retry] Retrying '{keyword}' (rank {rank})")
-
-                    scraper = DouyinScraper(
-                        keyword=keyword,
-                        limit=getattr(cfg, "max_posts_per_hashtag", 10),
-                        shared_context=context,
+                run.budget = budget_for(cfg, trending_keywords)
+                metrics.inc("keywords_requested", len(trending_keywords))
+                if cfg.browser_processes > 0:
+                    fleet = BrowserFleet(
+                        cfg,
+                        processes=cfg.browser_processes,
+                        state_path=state_path,
+                        saved_at=[store.saved_at if store.fresh else None for store in stores],
+                        retries=run.retries,
+                        budget=run.budget,
                     )
-
-                    raw_data = await scraper.fetch_json()
-                    if not raw_data:
-                        Actor.log.warning(f"[retry] Still no data for {keyword}")
-                        continue
-
-                    structured = await scraper.extract_posts(raw_data)
-                    videos = structured.videos
-                    Actor.log.info(f"[retry] Collected {len(videos)} structured videos for '{keyword}'")
-
-                    if len(videos) == 0:
-                        Actor.log.warning(f"[retry] No videos again for '{keyword}'")
-                        continue
-
-                    total_likes = sum(v.likes or 0 for v in videos)
-                    total_comments = sum(v.comments or 0 for v in videos)
-                    total_shares = sum(v.shares or 0 for v in videos)
-                    avg_engagement_rate = round(
-                        sum((v.likes or 0) + (v.comments or 0) + (v.shares or 0) for v in videos)
-                        / max(1, len(videos)),
-                        2,
+                    failed_keywords = await fleet.run(trending_keywords, run.writer, run.aweme_index)
+                else:
+                    failed_keywords = await scrape_keywords(run, trending_keywords)
+
+                if failed_keywords:
+                    Actor.log.warning(
+                        f"[retry] {len(failed_keywords)} keywords failed after retrying: "
+                        + ", ".join(k["keyword"] for k in failed_keywords)
                     )
-
-                    engagement = EngagementMetrics(
-                        total_likes=total_likes,
-                        total_comments=total_comments,
-                        total_reposts=total_shares,
-                        avg_engagement_rate=avg_engagement_rate,
-                    )
-
-                    trend_data = DouyinTrend(
-                        keyword=keyword,
-                        rank=rank,
-                        heat=keyword_info.get("heat"),
-                        total_videos=len(videos),
-                        engagement_metrics=engagement,
-                        videos=videos,
-                    )
-
-                    await Actor.push_data(trend_data.model_dump())
-                    all_results.append(trend_data.model_dump())
-
-                    await asyncio.sleep(3 + (rank % 3))
-
-            Actor.log.info("[session] Closing persistent browser context.")
-            await context.close()
-            await browser.close()
-
-        Actor.log.info(f"Completed scraping {len(all_results)} Douyin trends successfully.")
+                metrics.inc("keywords_failed", len(failed_keywords))
+        finally:
+            await run.writer.add_aggregates()
+            await run.writer.flush()
+            if run.direct_client:
+                await run.direct_client.close()
+            await author_enricher.close()
+            await run.browser.close()
+            decode_pool.close()
+            await archive.upload(cfg.archive_store_name)
+            await parquet_export.upload(cfg.parquet_store_name)
+            await trend_store.save()
+            metrics.inc("keywords_succeeded", run.writer.summaries_pushed)
+            metrics.inc("videos_pushed", run.writer.videos_pushed)
+            if timer.first_capture is not None:
+                metrics.observe("cold_start_first_capture", timer.first_capture)
+            await metrics.save(prometheus=cfg.metrics_prometheus)
+
+        Actor.log.info(
+            f"Completed scraping {run.writer.summaries_pushed} Douyin trends successfully "
+            f"({run.writer.videos_pushed} videos pushed, {len(run.aweme_index)} unique)."
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+from apify import Actor
+
+
+class Timing:
+    """Count / total / min / max of one timed stage; constant memory per stage."""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, count: int, total: float, min_: float, max_: float):
+        self.count += count
+        self.total += total
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 4),
+            "avg_s": round(self.total / self.count, 6) if self.count else 0.0,
+            "min_s": round(self.min, 6) if self.count else 0.0,
+            "max_s": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """Run-wide stage timings and counters.
+
+    Stages record into the module-level ``metrics`` instance; ``save`` writes a
+    run-summary record to the default key-value store and, optionally, a
+    Prometheus text-format dump next to it.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, Timing] = {}
+        self.counters: Dict[str, float] = {}
+        self.peaks: Dict[str, float] = {}
+
+    def observe(self, name: str, seconds: float):
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = Timing()
+        timing.observe(seconds)
+
+    def inc(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name: str, value: float):
+        """Keep the highest value seen for a gauge (e.g. memory)."""
+        if value > self.peaks.get(name, float("-inf")):
+            self.peaks[name] = value
+
+    @contextmanager
+    def time(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def drain(self) -> dict:
+        """Return the raw timings and counters recorded so far and reset them.
+
+        Used by fleet worker processes to ship their metrics to the parent,
+        which folds them in with ``merge``.
+        """
+        snapshot = {
+            "timings": {name: (t.count, t.total, t.min, t.max) for name, t in self.timings.items()},
+            "counters": dict(self.counters),
+            "peaks": dict(self.peaks),
+        }
+        self.timings = {}
+        self.counters = {}
+        self.peaks = {}
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        for name, values in snapshot.get("timings", {}).items():
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = Timing()
+            timing.merge(*values)
+        for name, value in snapshot.get("counters", {}).items():
+            self.inc(name, value)
+        for name, value in snapshot.get("peaks", {}).items():
+            self.peak(name, value)
+
+    def summary(self) -> dict:
+        return {
+            "run_seconds": round(time.perf_counter() - self.started, 3),
+            "timings": {name: t.as_dict() for name, t in sorted(self.timings.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "peaks": {name: round(value, 3) for name, value in sorted(self.peaks.items())},
+        }
+
+    def to_prometheus(self, prefix: str = "douyin") -> str:
+        lines = [
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {time.perf_counter() - self.started:.3f}",
+        ]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value:g}")
+        for name, value in sorted(self.peaks.items()):
+            lines.append(f"# TYPE {prefix}_{name}_peak gauge")
+            lines.append(f"{prefix}_{name}_peak {value:g}")
+        for name, t in sorted(self.timings.items()):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {t.count}")
+            lines.append(f"{metric}_sum {t.total:.6f}")
+            lines.append(f'{metric}{{quantile="1"}} {t.max:.6f}')
+        return "\n".join(lines) + "\n"
+
+    async def save(self, key: str = "RUN_METRICS", prometheus: bool = False):
+        summary = self.summary()
+        await Actor.set_value(key, summary)
+        if prometheus:
+            await Actor.set_value(f"{key}_PROM", self.to_prometheus(), content_type="text/plain; version=0.0.4")
+        Actor.log.info(f"[metrics] Run summary saved to key-value store key '{key}'.")
+        return summary
+
+
+metrics = Metrics()
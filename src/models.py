@@ -1,11 +1,135 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime, timezone
 class InputModel(BaseModel):
     max_hashtags: int = Field(default=3, ge=1, le=50, description="How many trending hashtags to fetch")
     max_posts_per_hashtag: int = Field(default=10, ge=1, le=50, description="How many posts to scrape per hashtag")
     max_pages: int = Field(default=3, ge=1, le=10, description="How many pages per hashtag to scrape")
     concurrency: int = Field(default=5, ge=1, le=20, description="Concurrent scraping threads")
+    browser_processes: int = Field(
+        default=0,
+        ge=0,
+        le=16,
+        description="Worker processes, each with its own browser and session (0 = one in-process browser)",
+    )
+    time_budget_minutes: Optional[float] = Field(
+        default=None, gt=0, le=1440, description="Wall-clock budget for scraping; keywords share it by yield"
+    )
+    heat_weighted_quota: bool = Field(
+        default=False, description="Split the total video quota across keywords by hot-list heat"
+    )
+    min_yield_per_round: float = Field(
+        default=0.5,
+        ge=0,
+        le=20,
+        description="With a budget, stop a keyword once it yields fewer new videos per scroll round than this",
+    )
+    watch_interval_minutes: Optional[float] = Field(
+        default=None,
+        gt=0,
+        le=1440,
+        description="Keep running and poll the hot list this often, scraping only new or moving keywords",
+    )
+    watch_cycles: int = Field(default=0, ge=0, le=10000, description="Hot-list polls before watch mode stops (0 = until stopped)")
+    watch_refresh_minutes: float = Field(
+        default=60, gt=0, le=1440, description="Refresh a known keyword after this long, sooner the more its rank moved"
+    )
+    watch_refresh_videos: int = Field(
+        default=5, ge=1, le=50, description="Top videos re-scraped when a known keyword is refreshed"
+    )
+    watch_store_name: str = Field(default="douyin-watch", description="Key-value store holding the last hot-list snapshot")
+    retry_budget: int = Field(
+        default=10, ge=0, le=200, description="Keyword retries allowed across the whole run, or per cycle in watch mode (backoff per failure type)"
+    )
+    block_resources: bool = Field(default=True, description="Abort requests for resources the scraper never reads")
+    blocked_resource_types: List[str] = Field(
+        default=["image", "media", "font"],
+        description="Playwright resource types to abort (image, media, font, stylesheet, ...)",
+    )
+    blocked_url_patterns: List[str] = Field(default=[], description="Regex patterns of URLs to abort")
+    allowed_url_patterns: List[str] = Field(default=[], description="Regex patterns of URLs that are never aborted")
+    scroll_pause: float = Field(default=0.5, ge=0.1, le=10, description="Initial wait for an API response after each scroll")
+    max_scroll_pause: float = Field(default=4.0, ge=0.1, le=30, description="Upper bound of the scroll backoff")
+    pagination: Literal["scroll", "fetch"] = Field(
+        default="scroll",
+        description="Load later result pages by scrolling, or by calling fetch inside the page (no card rendering)",
+    )
+    idle_timeout: float = Field(default=8.0, ge=1, le=60, description="Stop a keyword after this many seconds without API calls")
+    decode_workers: int = Field(
+        default=2, ge=0, le=16, description="Workers decoding captured responses off the event loop (0 = inline)"
+    )
+    decode_executor: Literal["thread", "process"] = Field(
+        default="thread", description="Run response decoding in a thread or a process pool"
+    )
+    parse_executor: Literal["thread", "process"] = Field(
+        default="process", description="Run parsing of accepted awemes in a thread or a process pool"
+    )
+    output_mode: Literal["nested", "normalized"] = Field(
+        default="nested",
+        description="Nest authors, music and hashtags in every video, or write each once to its own named dataset",
+    )
+    entity_dataset_prefix: str = Field(
+        default="douyin", description="Named datasets <prefix>-authors, -music and -hashtags in normalized mode"
+    )
+    push_batch_size: int = Field(default=50, ge=1, le=1000, description="Records per Actor.push_data call")
+    strict_validation: bool = Field(
+        default=False,
+        description="Validate every parsed record with Pydantic (slower; for debugging schema changes)",
+    )
+    browser_recycle_keywords: int = Field(
+        default=20, ge=0, le=1000, description="Restart the browser after this many keywords, keeping cookies (0 = never)"
+    )
+    browser_memory_limit_mb: int = Field(
+        default=2048, ge=0, le=32768, description="Restart the browser once its processes use more memory (0 = no limit)"
+    )
+    top_creators_per_hashtag: int = Field(
+        default=5, ge=0, le=50, description="Top creators kept per hashtag aggregate (0 = no hashtag aggregates)"
+    )
+    trend_history: bool = Field(
+        default=False, description="Keep per-video like/view history across runs to fill the trend fields"
+    )
+    trend_store_name: str = Field(default="douyin-trends", description="Key-value store holding the trend history")
+    trend_retention_days: float = Field(default=14, gt=0, le=365, description="Drop trend history points older than this")
+    enrich_authors: bool = Field(
+        default=False, description="Fetch author profiles for following count, signature and verification"
+    )
+    profile_concurrency: int = Field(default=4, ge=1, le=32, description="Profile requests in flight")
+    profile_cache_hours: float = Field(default=72, gt=0, le=720, description="Reuse a cached author profile this long")
+    profile_cache_size: int = Field(default=5000, ge=100, le=100000, description="Author profiles kept in the cache")
+    profile_store_name: str = Field(default="douyin-profiles", description="Key-value store holding the profile cache")
+    profile_api_url: Optional[str] = Field(default=None, description="Override the profile API endpoint")
+    session_store_name: str = Field(default="douyin-session", description="Key-value store holding the browser session")
+    session_pool_size: int = Field(
+        default=1, ge=1, le=8, description="Browser contexts with their own session; login walls rotate to the healthiest"
+    )
+    session_max_age_hours: float = Field(default=12, gt=0, le=168, description="Re-warm the stored session after this age")
+    metrics_prometheus: bool = Field(
+        default=False,
+        description="Also store the run metrics in Prometheus text format (key RUN_METRICS_PROM)",
+    )
+    record_dir: Optional[str] = Field(
+        default=None,
+        description="Save raw hot-list and search API bodies to this directory for offline replay",
+    )
+    archive_dir: Optional[str] = Field(
+        default=None,
+        description="Archive decoded API chunks as gzip JSON-lines here and upload them to archive_store_name",
+    )
+    archive_store_name: str = Field(default="douyin-archive", description="Key-value store for chunk archives")
+    parquet_dir: Optional[str] = Field(
+        default=None,
+        description="Also write videos, authors, hashtags and keyword trends as Parquet tables here and upload them",
+    )
+    parquet_store_name: str = Field(default="douyin-parquet", description="Key-value store for Parquet tables")
+    reparse_archive: Optional[str] = Field(
+        default=None,
+        description="Rebuild the dataset from archives whose run prefix starts with this value instead of scraping",
+    )
+    direct_api: bool = Field(
+        default=False,
+        description="Call the search API directly with the saved session cookies, falling back to the browser",
+    )
+    direct_api_url: Optional[str] = Field(default=None, description="Override the search API endpoint")
 
 class EngagementMetrics(BaseModel):
     total_likes: int = Field(..., description="Total likes across all posts for a hashtag")
@@ -20,6 +144,7 @@ class AuthorModel(BaseModel):
     author_verified: Optional[bool] = False
     author_avatar: Optional[str]
     author_signature: Optional[str] = None
+    author_sec_uid: Optional[str] = None
 
 class MusicModel(BaseModel):
     music_id: Optional[str]
@@ -82,6 +207,7 @@ class HashtagAggregateModel(BaseModel):
     total_views: Optional[int]
     total_engagement: Optional[int]
     avg_engagement_rate: Optional[float]
+    creator_followers: Optional[int] = None
     top_creators: Optional[List[AuthorModel]] = []
 
 class DouyinResponseModel(BaseModel):
@@ -96,4 +222,14 @@ class DouyinTrend(BaseModel):
     total_videos: int
     engagement_metrics: "EngagementMetrics"
     videos: List["VideoModel"]
-    scraped_at: datetime = datetime.now(timezone.utc)
\ No newline at end of file
+    related_video_ids: List[str] = []
+    scraped_at: datetime = datetime.now(timezone.utc)
+
+class KeywordSummaryModel(BaseModel):
+    keyword: str
+    rank: int
+    heat: Optional[int] = None
+    total_videos: int
+    engagement_metrics: EngagementMetrics
+    related_video_ids: List[str] = []
+    scraped_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
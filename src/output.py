@@ -0,0 +1,172 @@
+import json
+from typing import IO, Dict, List, Optional, Set
+from apify import Actor
+from .aggregate import HashtagAggregator, KeywordStats
+from .metrics import metrics
+from .models import InputModel, KeywordSummaryModel, VideoModel
+from .parquet_export import parquet_export
+
+
+class DatasetWriter:
+    """Streams records to the default dataset in fixed-size batches.
+
+    Each parsed video is serialized immediately and buffered; a batch is pushed
+    once ``batch_size`` records are waiting. Nothing is retained after a push, so
+    memory stays bounded by one batch regardless of run size. Each keyword's
+    engagement columns go to ``aggregator`` for the hashtag aggregates pushed
+    by ``add_aggregates`` (``top_creators=0`` turns them off).
+    """
+
+    def __init__(self, batch_size: int = 50, top_creators: int = 5):
+        self.batch_size = batch_size
+        self._buffer: List[dict] = []
+        self.videos_pushed = 0
+        self.summaries_pushed = 0
+        self.aggregates_pushed = 0
+        self.aggregator = HashtagAggregator(top_k=top_creators) if top_creators else None
+
+    async def add_video(self, video: VideoModel, keyword_info: dict):
+        record = video.model_dump()
+        record["record_type"] = "video"
+        record["keyword"] = keyword_info["keyword"]
+        record["trending_rank"] = keyword_info["rank"]
+        self._buffer.append(record)
+        self.videos_pushed += 1
+        parquet_export.add_video(video, keyword_info)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def add_summary(self, keyword_info: dict, stats: KeywordStats, related_video_ids: Optional[List[str]] = None):
+        related_video_ids = related_video_ids or []
+        summary = KeywordSummaryModel.model_construct(
+            keyword=keyword_info["keyword"],
+            rank=keyword_info["rank"],
+            heat=keyword_info.get("heat"),
+            total_videos=stats.videos + len(related_video_ids),
+            engagement_metrics=stats.engagement(),
+            related_video_ids=related_video_ids,
+        )
+        record = summary.model_dump()
+        record["record_type"] = "keyword_summary"
+        self._buffer.append(record)
+        self.summaries_pushed += 1
+        if self.aggregator is not None:
+            self.aggregator.add(keyword_info, stats)
+        parquet_export.finish_keyword(keyword_info, stats, related_video_ids)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def add_aggregates(self):
+        """Push one ``hashtag_aggregate`` record per hashtag seen since the last call."""
+        if not self.aggregator:
+            return
+        with metrics.time("aggregate"):
+            aggregates = self.aggregator.aggregate()
+        self.aggregator.reset()
+        for aggregate in aggregates:
+            record = aggregate.model_dump()
+            record["record_type"] = "hashtag_aggregate"
+            self._buffer.append(record)
+            self.aggregates_pushed += 1
+            if len(self._buffer) >= self.batch_size:
+                await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        with metrics.time("push"):
+            await self._push(batch)
+        metrics.inc("records_pushed", len(batch))
+
+    async def _push(self, batch: List[dict]):
+        await Actor.push_data(batch)
+
+
+class NormalizedDatasetWriter(DatasetWriter):
+    """DatasetWriter that writes authors, music and hashtags once, to their own datasets.
+
+    Video records keep ``author_id``, ``music_id`` and ``hashtag_names`` instead
+    of the nested objects. Each entity is pushed to the named dataset
+    ``<prefix>-authors`` / ``-music`` / ``-hashtags`` the first time the run
+    sees it; the in-run index only holds the IDs. Named datasets outlive the
+    run, so an entity is unique within a run but may recur across runs.
+    """
+
+    ENTITIES = ("authors", "music", "hashtags")
+
+    def __init__(self, batch_size: int = 50, top_creators: int = 5, prefix: str = "douyin"):
+        super().__init__(batch_size=batch_size, top_creators=top_creators)
+        self.prefix = prefix
+        self._seen: Dict[str, Set[str]] = {name: set() for name in self.ENTITIES}
+        self._entities: Dict[str, List[dict]] = {name: [] for name in self.ENTITIES}
+        self._datasets: Dict[str, object] = {}
+        self.entities_pushed = 0
+
+    def _add_entity(self, name: str, key: Optional[str], entity) -> Optional[str]:
+        if not key:
+            return None
+        seen = self._seen[name]
+        if key in seen:
+            metrics.inc(f"{name}_deduplicated")
+        else:
+            seen.add(key)
+            self._entities[name].append(entity.model_dump())
+        return key
+
+    async def add_video(self, video: VideoModel, keyword_info: dict):
+        record = video.model_dump(exclude={"author", "music", "hashtags"})
+        record["record_type"] = "video"
+        record["keyword"] = keyword_info["keyword"]
+        record["trending_rank"] = keyword_info["rank"]
+        author, music = video.author, video.music
+        record["author_id"] = self._add_entity("authors", author.author_id if author else None, author)
+        record["music_id"] = self._add_entity("music", music.music_id if music else None, music)
+        record["hashtag_names"] = [
+            self._add_entity("hashtags", h.hashtag_name, h) for h in video.hashtags or () if h.hashtag_name
+        ]
+        self._buffer.append(record)
+        self.videos_pushed += 1
+        parquet_export.add_video(video, keyword_info)
+        if len(self._buffer) >= self.batch_size or any(
+            len(batch) >= self.batch_size for batch in self._entities.values()
+        ):
+            await self.flush()
+
+    async def flush(self):
+        await super().flush()
+        for name, batch in self._entities.items():
+            if not batch:
+                continue
+            self._entities[name] = []
+            with metrics.time("push"):
+                await self._push_entities(name, batch)
+            metrics.inc(f"{name}_pushed", len(batch))
+            self.entities_pushed += len(batch)
+
+    async def _push_entities(self, name: str, batch: List[dict]):
+        dataset = self._datasets.get(name)
+        if dataset is None:
+            dataset = self._datasets[name] = await Actor.open_dataset(name=f"{self.prefix}-{name}")
+        await dataset.push_data(batch)
+
+
+def writer_for(cfg: InputModel) -> DatasetWriter:
+    """The dataset writer for the input's ``output_mode``."""
+    if cfg.output_mode == "normalized":
+        return NormalizedDatasetWriter(
+            batch_size=cfg.push_batch_size, top_creators=cfg.top_creators_per_hashtag, prefix=cfg.entity_dataset_prefix
+        )
+    return DatasetWriter(batch_size=cfg.push_batch_size, top_creators=cfg.top_creators_per_hashtag)
+
+
+class JsonLinesWriter(DatasetWriter):
+    """DatasetWriter that appends records to a local JSON-lines file instead of the dataset."""
+
+    def __init__(self, fh: IO[str], batch_size: int = 500):
+        super().__init__(batch_size=batch_size)
+        self.fh = fh
+
+    async def _push(self, batch: List[dict]):
+        for record in batch:
+            self.fh.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,228 @@
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from apify import Actor
+
+from .models import VideoModel
+
+if TYPE_CHECKING:
+    from .aggregate import KeywordStats
+
+TABLES = ("videos", "authors", "hashtags", "keyword_trends")
+
+
+def _schemas():
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    return {
+        "videos": pa.schema([
+            ("video_id", pa.string()),
+            ("keyword", text),
+            ("trending_rank", pa.int32()),
+            ("title", pa.string()),
+            ("video_url", pa.string()),
+            ("thumbnail", pa.string()),
+            ("duration", pa.int32()),
+            ("publish_time", pa.timestamp("s")),
+            ("video_type", text),
+            ("likes", pa.int64()),
+            ("comments", pa.int64()),
+            ("shares", pa.int64()),
+            ("views", pa.int64()),
+            ("favorites", pa.int64()),
+            ("engagement_rate", pa.float64()),
+            ("author_id", text),
+            ("music_id", text),
+            ("aspect_ratio", text),
+            ("video_quality", text),
+            ("time_since_publish", pa.float64()),
+            ("trend_velocity", pa.float64()),
+            ("trend_direction", text),
+            ("peak_time", pa.timestamp("s")),
+        ]),
+        "authors": pa.schema([
+            ("author_id", pa.string()),
+            ("author_name", pa.string()),
+            ("author_followers", pa.int64()),
+            ("author_following", pa.int64()),
+            ("author_verified", pa.bool_()),
+            ("author_avatar", pa.string()),
+            ("author_signature", pa.string()),
+            ("author_sec_uid", pa.string()),
+        ]),
+        "hashtags": pa.schema([
+            ("video_id", pa.string()),
+            ("keyword", text),
+            ("hashtag_id", text),
+            ("hashtag_name", text),
+            ("is_commerce", pa.bool_()),
+        ]),
+        "keyword_trends": pa.schema([
+            ("keyword", pa.string()),
+            ("rank", pa.int32()),
+            ("heat", pa.int64()),
+            ("total_videos", pa.int64()),
+            ("total_likes", pa.int64()),
+            ("total_comments", pa.int64()),
+            ("total_reposts", pa.int64()),
+            ("avg_engagement_rate", pa.float64()),
+            ("related_videos", pa.int64()),
+            ("scraped_at", pa.timestamp("s", tz="UTC")),
+        ]),
+    }
+
+
+class ParquetExport:
+    """Opt-in columnar copy of the dataset: one Parquet file per table.
+
+    ``videos``, ``authors`` (each creator once per run), ``hashtags`` (one row
+    per video/hashtag pair) and ``keyword_trends`` (one row per keyword
+    summary). Rows are buffered per keyword until its summary arrives; finished
+    keywords are written as a row group once a table has ``row_group_rows``
+    of them waiting, so memory stays bounded while row groups stay large enough
+    to read quickly. Repetitive strings are dictionary-encoded.
+    """
+
+    def __init__(self, row_group_rows: int = 10000):
+        self.directory: Optional[str] = None
+        self.row_group_rows = row_group_rows
+        self._writers: Dict[str, object] = {}
+        self._schemas: Dict[str, object] = {}
+        self._rows: Dict[str, Dict[str, List[dict]]] = {}
+        self._finished: Dict[str, List[dict]] = {table: [] for table in TABLES}
+        self._authors: Set[str] = set()
+        self.row_groups = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def configure(self, directory: Optional[str]):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._schemas = _schemas()
+            Actor.log.info(f"[parquet] Writing Parquet tables to {directory}")
+
+    def path_for(self, table: str) -> str:
+        return os.path.join(self.directory, f"{table}.parquet")
+
+    def _pending(self, keyword: str) -> Dict[str, List[dict]]:
+        rows = self._rows.get(keyword)
+        if rows is None:
+            rows = self._rows[keyword] = {table: [] for table in TABLES}
+        return rows
+
+    def add_video(self, video: VideoModel, keyword_info: dict):
+        if not self.enabled:
+            return
+        keyword = keyword_info["keyword"]
+        rows = self._pending(keyword)
+        author, music = video.author, video.music
+        author_id = author.author_id if author else None
+        rows["videos"].append({
+            "video_id": video.video_id,
+            "keyword": keyword,
+            "trending_rank": keyword_info["rank"],
+            "title": video.title,
+            "video_url": video.video_url,
+            "thumbnail": video.thumbnail,
+            "duration": video.duration,
+            "publish_time": video.publish_time,
+            "video_type": video.video_type,
+            "likes": video.likes,
+            "comments": video.comments,
+            "shares": video.shares,
+            "views": video.views,
+            "favorites": video.favorites,
+            "engagement_rate": video.engagement_rate,
+            "author_id": author_id,
+            "music_id": music.music_id if music else None,
+            "aspect_ratio": video.aspect_ratio,
+            "video_quality": video.video_quality,
+            "time_since_publish": video.time_since_publish,
+            "trend_velocity": video.trend_velocity,
+            "trend_direction": video.trend_direction,
+            "peak_time": video.peak_time,
+        })
+        if author_id and author_id not in self._authors:
+            self._authors.add(author_id)
+            rows["authors"].append(author.model_dump())
+        for hashtag in video.hashtags or ():
+            rows["hashtags"].append({
+                "video_id": video.video_id,
+                "keyword": keyword,
+                "hashtag_id": hashtag.hashtag_id,
+                "hashtag_name": hashtag.hashtag_name,
+                "is_commerce": hashtag.is_commerce,
+            })
+
+    def finish_keyword(self, keyword_info: dict, stats: "KeywordStats", related_video_ids: List[str]):
+        """Queue the keyword's buffered rows and its trend row for the next row groups."""
+        if not self.enabled:
+            return
+        engagement = stats.engagement()
+        rows = self._rows.pop(keyword_info["keyword"], None) or {table: [] for table in TABLES}
+        rows["keyword_trends"].append({
+            "keyword": keyword_info["keyword"],
+            "rank": keyword_info["rank"],
+            "heat": keyword_info.get("heat"),
+            "total_videos": stats.videos + len(related_video_ids),
+            "total_likes": engagement.total_likes,
+            "total_comments": engagement.total_comments,
+            "total_reposts": engagement.total_reposts,
+            "avg_engagement_rate": engagement.avg_engagement_rate,
+            "related_videos": len(related_video_ids),
+            "scraped_at": datetime.now(timezone.utc),
+        })
+        for table, records in rows.items():
+            self._finished[table].extend(records)
+            if len(self._finished[table]) >= self.row_group_rows:
+                self._write(table)
+
+    def _write(self, table: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        records, self._finished[table] = self._finished[table], []
+        if not records:
+            return
+        schema = self._schemas[table]
+        writer = self._writers.get(table)
+        if writer is None:
+            writer = self._writers[table] = pq.ParquetWriter(
+                self.path_for(table), schema, compression="zstd", use_dictionary=True
+            )
+        writer.write_table(pa.Table.from_pylist(records, schema=schema))
+        self.row_groups += 1
+
+    def close(self):
+        """Write the remaining rows and finalize the files."""
+        if not self.enabled:
+            return
+        for table in TABLES:
+            self._write(table)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    async def upload(self, store_name: str):
+        """Store every table in ``store_name`` under ``<run prefix>-<table>``."""
+        if not self.enabled:
+            return
+        self.close()
+        store = await Actor.open_key_value_store(name=store_name)
+        prefix = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        for table in TABLES:
+            path = self.path_for(table)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as fh:
+                await store.set_value(f"{prefix}-{table}", fh.read(), content_type="application/vnd.apache.parquet")
+        Actor.log.info(
+            f"[parquet] Uploaded {self.row_groups} row groups to key-value store '{store_name}' (prefix {prefix})."
+        )
+
+
+parquet_export = ParquetExport()
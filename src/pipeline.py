@@ -0,0 +1,221 @@
+import asyncio
+import time
+from typing import Iterable, List, Optional, Tuple
+from apify import Actor
+
+from .models import InputModel, VideoModel
+from .scraper import DouyinScraper
+from .direct_api import DirectSearchClient
+from .aweme_index import AwemeIndex
+from .output import DatasetWriter, KeywordStats
+from .archive import archive
+from .trend_store import trend_store
+from .profiles import author_enricher
+from .budget import KeywordPlan, RunBudget
+from .metrics import metrics
+from .retry import EMPTY, LOGIN_WALL, KeywordFailure, RetryScheduler, classify_failure
+from .session import BrowserSession, ColdStartTimer
+
+
+class RunState:
+    """Services shared by every keyword of a run."""
+
+    def __init__(
+        self,
+        cfg: InputModel,
+        browser: BrowserSession,
+        writer: Optional[DatasetWriter],
+        aweme_index: AwemeIndex,
+        direct_client: Optional[DirectSearchClient] = None,
+        timer: Optional[ColdStartTimer] = None,
+        retries: Optional[RetryScheduler] = None,
+        budget: Optional[RunBudget] = None,
+    ):
+        self.cfg = cfg
+        self.browser = browser
+        self.writer = writer
+        self.aweme_index = aweme_index
+        self.direct_client = direct_client
+        self.timer = timer
+        self.retries = retries or RetryScheduler()
+        self.budget = budget
+
+
+async def collect_keyword(
+    run: RunState,
+    keyword_info: dict,
+    log_prefix: str = "",
+    use_direct: bool = True,
+    plan: Optional[KeywordPlan] = None,
+) -> Tuple[List[VideoModel], List[str]]:
+    """Scrape one keyword and return ``(videos, shared_ids)``.
+
+    The quota and stop rules come from ``plan``, or from the run budget when
+    there is one. Raises ``KeywordFailure`` when nothing was captured.
+    """
+    cfg = run.cfg
+    keyword = keyword_info["keyword"]
+    rank = keyword_info["rank"]
+    if plan is None and run.budget:
+        plan = run.budget.plan(keyword_info)
+    limit = plan.limit if plan else keyword_info.get("limit") or getattr(cfg, "max_posts_per_hashtag", 10)
+
+    Actor.log.info(f"{log_prefix}Scraping up to {limit} videos for '{keyword}' (rank {rank})")
+    archive.start_keyword(keyword_info)
+
+    scraper = DouyinScraper(
+        keyword=keyword,
+        limit=limit,
+        scroll_pause=cfg.scroll_pause,
+        max_scroll_pause=cfg.max_scroll_pause,
+        idle_timeout=cfg.idle_timeout,
+        aweme_index=run.aweme_index,
+        strict=cfg.strict_validation,
+        on_capture=run.timer.mark if run.timer else None,
+        plan=plan,
+        pagination=cfg.pagination,
+    )
+
+    raw_data = None
+    try:
+        if run.direct_client and use_direct:
+            # Stop accepting at the limit, so videos past it are neither reported
+            # nor claimed from other keywords.
+            awemes = await run.direct_client.search(
+                keyword, limit, accept=lambda found: scraper.accept_videos(found, limit=limit)
+            )
+            if awemes is not None:
+                if run.timer:
+                    run.timer.mark("direct API")
+                raw_data = {"data": scraper.videos_flat, "shared_ids": scraper.shared_ids}
+            else:
+                Actor.log.info(f"{log_prefix}Direct API unavailable for '{keyword}' — using browser.")
+
+        if raw_data is None:
+            raw_data = await fetch_with_pool(run.browser, scraper, log_prefix)
+    finally:
+        if run.budget and plan:
+            run.budget.finish(plan, len(scraper.videos_flat))
+    shared_ids = raw_data.get("shared_ids", []) if raw_data else []
+    if not raw_data or not (raw_data.get("data") or shared_ids):
+        Actor.log.warning(f"{log_prefix}No data for {keyword}")
+        raise KeywordFailure(LOGIN_WALL if scraper.login_required else EMPTY, keyword)
+
+    return await scraper.parse_posts(raw_data), shared_ids
+
+
+async def fetch_with_pool(browser: BrowserSession, scraper: DouyinScraper, log_prefix: str = "") -> dict:
+    """Run ``scraper`` on the healthiest pooled session.
+
+    A login wall quarantines that session and the keyword is re-dispatched at
+    once to the next best one (with a single session, to the re-warmed one).
+    """
+    attempts = len(browser.sessions) + 1
+    for attempt in range(1, attempts + 1):
+        session = await browser.acquire()
+        scraper.shared_context = session.context
+        scraper.page_pool = session
+        started = time.perf_counter()
+        try:
+            raw_data = await scraper.fetch_json()
+        except Exception:
+            browser.release(session, "error", time.perf_counter() - started)
+            raise
+
+        if scraper.login_required:
+            outcome = "login"
+        elif raw_data["data"] or raw_data["shared_ids"]:
+            outcome = "ok"
+        else:
+            outcome = "empty"
+        browser.release(session, outcome, time.perf_counter() - started)
+
+        if outcome != "login" or attempt == attempts:
+            return raw_data
+        metrics.inc("keywords_redispatched")
+        Actor.log.info(
+            f"{log_prefix}Login wall on session {session.index} — re-dispatching '{scraper.keyword}' "
+            f"to another session."
+        )
+        scraper.rearm()
+    return raw_data
+
+
+async def emit_keyword(
+    writer: DatasetWriter,
+    keyword_info: dict,
+    videos: Iterable[VideoModel],
+    shared_ids: List[str],
+    log_prefix: str = "",
+) -> bool:
+    """Push a keyword's videos and its summary. Returns False when there was nothing to report."""
+    keyword = keyword_info["keyword"]
+    stats = KeywordStats()
+    videos = trend_store.enrich(videos, keyword_info)
+    if author_enricher.enabled:
+        videos = list(videos)
+        await author_enricher.enrich(videos)
+    for video in videos:
+        stats.add(video)
+        await writer.add_video(video, keyword_info)
+
+    Actor.log.info(
+        f"{log_prefix}Collected {stats.videos} structured videos for '{keyword}' "
+        f"(+{len(shared_ids)} already reported under other keywords)"
+    )
+
+    if stats.videos == 0 and not shared_ids:
+        Actor.log.warning(f"{log_prefix}No videos for '{keyword}'")
+        return False
+
+    await writer.add_summary(keyword_info, stats, shared_ids)
+    return True
+
+
+async def scrape_keywords(run: RunState, keywords: list) -> list:
+    """Scrape keywords with at most ``cfg.concurrency`` pages in flight.
+
+    Every keyword runs in its own task and holds a page slot only while it is
+    being scraped; enrichment and pushing happen after the slot is released,
+    so slow profile lookups do not keep pages idle. A failed keyword waits out
+    its backoff (see ``RetryScheduler``) without a slot and then queues for the
+    next free one, so retries overlap with the rest of the run. Results are
+    pushed as soon as a keyword finishes, not in rank order. Returns the
+    keywords that still failed after retrying.
+    """
+    failed_keywords = []
+    workers = max(1, min(getattr(run.cfg, "concurrency", 5), len(keywords)))
+    pages = asyncio.Semaphore(workers)
+    Actor.log.info(f"[pool] Scraping {len(keywords)} keywords with {workers} concurrent pages.")
+
+    async def run_keyword(index: int, keyword_info: dict):
+        # Stagger start-up so the pool does not open every search page at once.
+        if index < workers:
+            await asyncio.sleep(index * 1.5)
+        log_prefix = f"[#{keyword_info['rank']}] "
+        try:
+            async for attempt in run.retries.retrying():
+                with attempt:
+                    async with pages:
+                        if run.budget and run.budget.expired:
+                            Actor.log.info(f"[budget] Run deadline reached — skipping '{keyword_info['keyword']}'.")
+                            metrics.inc("keywords_skipped_deadline")
+                            return
+                        first = attempt.retry_state.attempt_number == 1
+                        try:
+                            # The direct path already failed on a retry; go straight to the browser.
+                            videos, shared_ids = await collect_keyword(
+                                run, keyword_info, log_prefix=log_prefix, use_direct=first
+                            )
+                        finally:
+                            await asyncio.sleep(3 + (keyword_info["rank"] % 3))
+                    if not await emit_keyword(run.writer, keyword_info, videos, shared_ids, log_prefix=log_prefix):
+                        raise KeywordFailure(EMPTY, keyword_info["keyword"])
+        except Exception as e:
+            Actor.log.warning(
+                f"[pool] Giving up on '{keyword_info['keyword']}' ({classify_failure(e)}): {e}"
+            )
+            failed_keywords.append(keyword_info)
+
+    await asyncio.gather(*(run_keyword(i, keyword_info) for i, keyword_info in enumerate(keywords)))
+    return failed_keywords
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import aiohttp
+from apify import Actor
+
+from .direct_api import SEARCH_PARAMS, USER_AGENT, load_storage_cookies
+from .metrics import metrics
+from .models import VideoModel
+from .utils import DOUYIN_BASE_URL
+
+DOUYIN_PROFILE_API = f"{DOUYIN_BASE_URL}/aweme/v1/web/user/profile/other/"
+CACHE_KEY = "AUTHOR_PROFILES"
+
+PROFILE_PARAMS = {k: v for k, v in SEARCH_PARAMS.items() if not k.startswith("search_")}
+
+
+class ProfileCache:
+    """Author profiles by ``uid``: an LRU of at most ``max_size`` entries that expire after ``ttl_s``.
+
+    ``load``/``save`` keep it in a named key-value store, so popular creators
+    are not fetched again on every run.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl_s: float = 72 * 3600):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, uid: str) -> Optional[dict]:
+        entry = self._entries.get(uid)
+        if entry is None:
+            return None
+        fetched_at, profile = entry
+        if time.time() - fetched_at >= self.ttl_s:
+            del self._entries[uid]
+            return None
+        self._entries.move_to_end(uid)
+        return profile
+
+    def put(self, uid: str, profile: dict, fetched_at: Optional[float] = None):
+        self._entries[uid] = (fetched_at or time.time(), profile)
+        self._entries.move_to_end(uid)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def load(self, store_name: str):
+        try:
+            store = await Actor.open_key_value_store(name=store_name)
+            record = await store.get_value(CACHE_KEY) or {}
+        except Exception as e:
+            Actor.log.warning(f"[profiles] Could not read profile cache '{store_name}': {e}")
+            return
+        # Stored oldest first, so the LRU order survives the round trip.
+        for uid, entry in record.get("profiles", {}).items():
+            if time.time() - entry["fetched_at"] < self.ttl_s:
+                self.put(uid, entry["profile"], fetched_at=entry["fetched_at"])
+        Actor.log.info(f"[profiles] Restored {len(self)} cached author profiles.")
+
+    async def save(self, store_name: str):
+        now = time.time()
+        profiles = {
+            uid: {"fetched_at": fetched_at, "profile": profile}
+            for uid, (fetched_at, profile) in self._entries.items()
+            if now - fetched_at < self.ttl_s
+        }
+        try:
+            store = await Actor.open_key_value_store(name=store_name)
+            await store.set_value(CACHE_KEY, {"profiles": profiles})
+        except Exception as e:
+            Actor.log.warning(f"[profiles] Could not persist profile cache: {e}")
+
+
+def parse_profile(user: dict) -> dict:
+    return {
+        "author_name": user.get("nickname"),
+        "author_followers": user.get("follower_count"),
+        "author_following": user.get("following_count"),
+        "author_signature": user.get("signature") or None,
+        "author_verified": bool(user.get("custom_verify") or user.get("enterprise_verify_reason")),
+    }
+
+
+class AuthorEnricher:
+    """Fills author following, signature and verification from the profile API.
+
+    Each keyword's unique authors are looked up in the cache; the rest are
+    fetched with at most ``concurrency`` requests in flight across the run,
+    over one HTTP session carrying the browser's saved cookies. After
+    ``max_failures`` consecutive failed requests (usually a login wall)
+    enrichment is switched off for the rest of the run.
+    """
+
+    def __init__(self):
+        self.store_name: Optional[str] = None
+        self.api_url = DOUYIN_PROFILE_API
+        self.cache = ProfileCache()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.max_failures = 5
+        self._failures = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.session is not None
+
+    def configure(
+        self,
+        store_name: str,
+        api_url: Optional[str] = None,
+        concurrency: int = 4,
+        cache_size: int = 5000,
+        cache_hours: float = 72,
+    ):
+        self.store_name = store_name
+        self.api_url = api_url or DOUYIN_PROFILE_API
+        self.cache = ProfileCache(max_size=cache_size, ttl_s=cache_hours * 3600)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def open(self, state_path: str, timeout: float = 10):
+        cookies = load_storage_cookies(state_path)
+        self.session = aiohttp.ClientSession(
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "application/json, text/plain, */*",
+                "Accept-Language": "zh-CN,zh;q=0.9",
+                "Referer": f"{DOUYIN_BASE_URL}/",
+            },
+            cookies=cookies,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+        await self.cache.load(self.store_name)
+
+    async def close(self):
+        if not self.session:
+            return
+        await self.session.close()
+        self.session = None
+        await self.cache.save(self.store_name)
+
+    async def enrich(self, videos: List[VideoModel]):
+        """Update the authors of ``videos`` in place."""
+        if not self.enabled:
+            return
+        authors = {}
+        for video in videos:
+            author = video.author
+            if author and author.author_id and author.author_sec_uid:
+                authors.setdefault(author.author_id, author.author_sec_uid)
+        if not authors:
+            return
+
+        with metrics.time("author_enrich"):
+            profiles = await asyncio.gather(*(self.profile(uid, sec_uid) for uid, sec_uid in authors.items()))
+        found = {uid: profile for uid, profile in zip(authors, profiles) if profile}
+        for video in videos:
+            profile = found.get(video.author.author_id) if video.author else None
+            if profile:
+                for field, value in profile.items():
+                    if value is not None:
+                        setattr(video.author, field, value)
+
+    async def profile(self, uid: str, sec_uid: str) -> Optional[dict]:
+        cached = self.cache.get(uid)
+        if cached is not None:
+            metrics.inc("profile_cache_hits")
+            return cached
+        # Keywords often share creators; let concurrent lookups share one request.
+        pending = self._inflight.get(uid)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = self._inflight[uid] = asyncio.get_running_loop().create_future()
+        try:
+            profile = await self._fetch(sec_uid)
+            if profile is not None:
+                self.cache.put(uid, profile)
+            future.set_result(profile)
+            return profile
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del self._inflight[uid]
+
+    async def _fetch(self, sec_uid: str) -> Optional[dict]:
+        async with self._semaphore:
+            if self._failures >= self.max_failures:
+                return None
+            params = {**PROFILE_PARAMS, "sec_user_id": sec_uid}
+            try:
+                with metrics.time("profile_request"):
+                    async with self.session.get(self.api_url, params=params) as resp:
+                        body = await resp.json(content_type=None) if resp.status == 200 else None
+            except Exception as e:
+                Actor.log.debug(f"[profiles] Request failed for {sec_uid}: {e}")
+                body = None
+
+        user = body.get("user") if isinstance(body, dict) and body.get("status_code", 0) == 0 else None
+        if not isinstance(user, dict):
+            self._failures += 1
+            metrics.inc("profile_failures")
+            if self._failures == self.max_failures:
+                Actor.log.warning(
+                    f"[profiles] {self.max_failures} profile requests failed in a row — "
+                    f"skipping author enrichment for the rest of the run."
+                )
+            return None
+        self._failures = 0
+        metrics.inc("profiles_fetched")
+        return parse_profile(user)
+
+
+author_enricher = AuthorEnricher()
@@ -0,0 +1,62 @@
+import os
+from typing import Optional
+from urllib.parse import quote, unquote
+from apify import Actor
+
+HOT_LIST_FILE = "hot_list.json"
+SEARCH_DIR = "search"
+
+
+def keyword_dir(root: str, keyword: str) -> str:
+    return os.path.join(root, SEARCH_DIR, quote(keyword, safe=""))
+
+
+def keyword_from_dir(name: str) -> str:
+    return unquote(name)
+
+
+class Recorder:
+    """Saves raw API bodies captured during a live run for offline replay.
+
+    Layout under ``root``::
+
+        hot_list.json
+        search/<url-quoted keyword>/<seq>_<stream|single>.bin
+
+    Bodies are stored exactly as received (after gzip), so chunked ``/stream/``
+    bodies keep their chunk-size lines. Disabled until ``configure`` is called.
+    """
+
+    def __init__(self):
+        self.root: Optional[str] = None
+        self._seq = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def configure(self, root: Optional[str]):
+        self.root = root
+        if root:
+            os.makedirs(os.path.join(root, SEARCH_DIR), exist_ok=True)
+            Actor.log.info(f"[recorder] Recording API bodies to {root}")
+
+    def record_hot_list(self, raw: bytes):
+        if not self.enabled:
+            return
+        with open(os.path.join(self.root, HOT_LIST_FILE), "wb") as fh:
+            fh.write(raw)
+
+    def record_search(self, keyword: str, url: str, raw: bytes):
+        if not self.enabled:
+            return
+        kind = "stream" if "/search/stream/" in url else "single"
+        directory = keyword_dir(self.root, keyword)
+        os.makedirs(directory, exist_ok=True)
+        seq = self._seq.get(keyword, 0)
+        self._seq[keyword] = seq + 1
+        with open(os.path.join(directory, f"{seq:03d}_{kind}.bin"), "wb") as fh:
+            fh.write(raw)
+
+
+recorder = Recorder()
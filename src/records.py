@@ -0,0 +1,80 @@
+"""Plain-dict records mirroring the output models, for the parse fast path.
+
+Building a Pydantic model, even with ``model_construct``, costs more than
+validating one on pydantic 2.x. The default parser builds these records
+instead: dicts with the models' field names, order and defaults, readable and
+writable as attributes, whose ``model_dump`` is a copy. ``strict=True`` keeps
+using the Pydantic models.
+"""
+from typing import Optional, Set
+
+from pydantic_core import PydanticUndefined
+
+from .models import AuthorModel, HashtagModel, MusicModel, VideoModel
+
+
+def _field_defaults(model) -> dict:
+    defaults = {}
+    for name, field in model.model_fields.items():
+        if field.default_factory is not None:
+            defaults[name] = field.default_factory()
+        elif field.default is PydanticUndefined:
+            defaults[name] = None
+        else:
+            defaults[name] = field.default
+    return defaults
+
+
+class Record(dict):
+    __slots__ = ()
+    _defaults: dict = {}
+
+    def __init__(self, **values):
+        super().__init__(self._defaults, **values)
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    __setattr__ = dict.__setitem__
+
+    def model_dump(self, exclude: Optional[Set[str]] = None) -> dict:
+        data = dict(self)
+        for name in exclude or ():
+            data.pop(name, None)
+        return data
+
+
+class AuthorRecord(Record):
+    __slots__ = ()
+    _defaults = _field_defaults(AuthorModel)
+
+
+class MusicRecord(Record):
+    __slots__ = ()
+    _defaults = _field_defaults(MusicModel)
+
+
+class HashtagRecord(Record):
+    __slots__ = ()
+    _defaults = _field_defaults(HashtagModel)
+
+
+class VideoRecord(Record):
+    __slots__ = ()
+    # The parser always passes hashtags, so the shared [] default is never mutated.
+    _defaults = _field_defaults(VideoModel)
+
+    def model_dump(self, exclude: Optional[Set[str]] = None) -> dict:
+        data = dict(self)
+        author, music = data["author"], data["music"]
+        if author is not None:
+            data["author"] = dict(author)
+        if music is not None:
+            data["music"] = dict(music)
+        data["hashtags"] = [dict(h) for h in data["hashtags"]]
+        for name in exclude or ():
+            data.pop(name, None)
+        return data
@@ -0,0 +1,98 @@
+"""Rebuild dataset records from a chunk archive without launching a browser.
+
+Usage:
+    python -m src.reparse ARCHIVE_DIR [-o records.jsonl] [--strict]
+
+Inside the actor, set the ``reparse_archive`` input to a key prefix of the
+``archive_store_name`` key-value store (e.g. ``20261017`` for one day) instead.
+"""
+import argparse
+import asyncio
+import io
+import sys
+from typing import Iterable, Optional, Set
+from apify import Actor
+
+from .archive import INDEX_KEY, iter_archive_dir, iter_archive_lines
+from .aweme_index import AwemeIndex, dedupe_awemes
+from .metrics import metrics
+from .output import DatasetWriter, JsonLinesWriter, KeywordStats
+from .scraper import DouyinScraper
+
+
+async def reparse_keyword(keyword: str, records: Iterable[dict], writer: DatasetWriter, aweme_index: AwemeIndex):
+    """Stream one keyword's archived chunks through the extractor and parser."""
+    keyword_info = {"keyword": keyword, "rank": 0, "heat": None}
+    seen: Set[str] = set()
+    shared_ids = []
+    stats = KeywordStats()
+
+    for record in records:
+        if record.get("type") == "keyword":
+            keyword_info["rank"] = record.get("rank") or keyword_info["rank"]
+            keyword_info["heat"] = record.get("heat") or keyword_info["heat"]
+            continue
+
+        awemes = DouyinScraper.extract_videos_from_obj(record.get("chunk"))
+        for aweme in dedupe_awemes(awemes, keyword, seen, aweme_index, shared_ids):
+            with metrics.time("parse_aweme"):
+                video = aweme_index.parse(aweme)
+            if video:
+                stats.add(video)
+                await writer.add_video(video, keyword_info)
+
+    if stats.videos or shared_ids:
+        await writer.add_summary(keyword_info, stats, shared_ids)
+    return stats.videos
+
+
+async def reparse_directory(directory: str, writer: DatasetWriter, strict: bool = False) -> int:
+    aweme_index = AwemeIndex(strict=strict)
+    total = 0
+    for keyword, records in iter_archive_dir(directory):
+        total += await reparse_keyword(keyword, records, writer, aweme_index)
+    await writer.add_aggregates()
+    await writer.flush()
+    return total
+
+
+async def reparse_store(store_name: str, prefix: str, writer: DatasetWriter, strict: bool = False) -> int:
+    """Reparse every archive in ``store_name`` whose run prefix starts with ``prefix``."""
+    store = await Actor.open_key_value_store(name=store_name)
+    index = await store.get_value(INDEX_KEY) or []
+    entries = [e for e in index if e["created"].startswith(prefix)]
+    Actor.log.info(f"[reparse] {len(entries)} archived keywords match prefix '{prefix}' in '{store_name}'.")
+
+    aweme_index = AwemeIndex(strict=strict)
+    total = 0
+    for entry in entries:
+        data = await store.get_value(entry["key"])
+        if not data:
+            Actor.log.warning(f"[reparse] Missing archive record {entry['key']}")
+            continue
+        records = iter_archive_lines(io.BytesIO(data))
+        total += await reparse_keyword(entry["keyword"], records, writer, aweme_index)
+    await writer.add_aggregates()
+    await writer.flush()
+    Actor.log.info(f"[reparse] Rebuilt {total} video records without a browser.")
+    return total
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archive_dir")
+    parser.add_argument("-o", "--output", help="JSON-lines output file (default: stdout)")
+    parser.add_argument("--strict", action="store_true", help="Validate every record with Pydantic")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        total = asyncio.run(reparse_directory(args.archive_dir, JsonLinesWriter(out), strict=args.strict))
+    finally:
+        if args.output:
+            out.close()
+    print(f"Reparsed {total} videos.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import re
+from typing import TYPE_CHECKING, Iterable, Optional
+from apify import Actor
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Route
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+
+# Requests the search page cannot work without, whatever the deny rules say.
+DEFAULT_ALLOWED_URL_PATTERNS = [
+    r"/aweme/v1/web/general/search/",
+]
+
+
+class ResourceFilter:
+    """Route handler that aborts requests the scraper never reads.
+
+    A request is blocked when its resource type or URL matches a deny rule and
+    no allow rule matches its URL. Allow rules always win, so the search XHRs
+    captured by ``DouyinScraper`` keep flowing even under broad deny patterns.
+    URL patterns are regular expressions searched anywhere in the URL.
+    """
+
+    def __init__(
+        self,
+        blocked_resource_types: Optional[Iterable[str]] = None,
+        blocked_url_patterns: Optional[Iterable[str]] = None,
+        allowed_url_patterns: Optional[Iterable[str]] = None,
+    ):
+        if blocked_resource_types is None:
+            blocked_resource_types = DEFAULT_BLOCKED_RESOURCE_TYPES
+        self.blocked_resource_types = {t.lower() for t in blocked_resource_types}
+        self.blocked_url_patterns = [re.compile(p) for p in (blocked_url_patterns or [])]
+        self.allowed_url_patterns = [
+            re.compile(p) for p in [*DEFAULT_ALLOWED_URL_PATTERNS, *(allowed_url_patterns or [])]
+        ]
+        self.blocked = 0
+        self.allowed = 0
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if any(p.search(url) for p in self.allowed_url_patterns):
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        return any(p.search(url) for p in self.blocked_url_patterns)
+
+    async def handle(self, route: "Route"):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked += 1
+            await route.abort()
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+    async def install(self, context: "BrowserContext"):
+        """Attach the filter to every page of ``context``."""
+        await context.route("**/*", self.handle)
+        Actor.log.info(
+            f"[filter] Blocking resource types {sorted(self.blocked_resource_types)} "
+            f"and {len(self.blocked_url_patterns)} URL patterns."
+        )
+
+    def log_summary(self):
+        Actor.log.info(f"[filter] Blocked {self.blocked} requests, allowed {self.allowed}.")
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Dict, Optional
+from apify import Actor
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception_type, wait_exponential_jitter
+
+from .metrics import metrics
+
+LOGIN_WALL = "login_wall"
+EMPTY = "empty"
+NAVIGATION_TIMEOUT = "navigation_timeout"
+ERROR = "error"
+
+
+class KeywordFailure(Exception):
+    """A keyword attempt that produced nothing usable; ``kind`` selects the retry policy."""
+
+    def __init__(self, kind: str, keyword: str):
+        super().__init__(f"{kind} for '{keyword}'")
+        self.kind = kind
+        self.keyword = keyword
+
+
+def classify_failure(exc: BaseException) -> str:
+    if isinstance(exc, KeywordFailure):
+        return exc.kind
+    # Playwright's TimeoutError does not derive from the builtin one; match it by name.
+    if isinstance(exc, asyncio.TimeoutError) or type(exc).__name__ == "TimeoutError":
+        return NAVIGATION_TIMEOUT
+    return ERROR
+
+
+class RetryPolicy:
+    """How often and how patiently one failure type is retried."""
+
+    def __init__(self, attempts: int, initial: float, maximum: float, jitter: float):
+        self.attempts = attempts
+        self.wait = wait_exponential_jitter(initial=initial, max=maximum, jitter=jitter)
+
+
+DEFAULT_POLICIES: Dict[str, RetryPolicy] = {
+    # Give the session pool time to re-warm a quarantined session.
+    LOGIN_WALL: RetryPolicy(attempts=3, initial=20, maximum=120, jitter=10),
+    EMPTY: RetryPolicy(attempts=2, initial=10, maximum=60, jitter=5),
+    NAVIGATION_TIMEOUT: RetryPolicy(attempts=3, initial=5, maximum=60, jitter=5),
+    ERROR: RetryPolicy(attempts=2, initial=5, maximum=30, jitter=5),
+}
+
+
+class RetryScheduler:
+    """Per-failure-type keyword retries sharing one run-wide budget.
+
+    ``retrying()`` drives a keyword in-process with tenacity: the keyword's task
+    sleeps through its backoff without holding a page, so other keywords keep
+    running. ``delay()`` gives the same decision to callers that requeue work
+    themselves (the browser fleet).
+    """
+
+    def __init__(self, budget: int = 10, policies: Optional[Dict[str, RetryPolicy]] = None):
+        self.budget = budget
+        self.policies = policies or DEFAULT_POLICIES
+
+    def policy(self, kind: str) -> RetryPolicy:
+        return self.policies.get(kind, self.policies[ERROR])
+
+    def _should_stop(self, kind: str, attempt: int) -> bool:
+        if self.budget <= 0:
+            metrics.inc("retry_budget_exhausted")
+            return True
+        return attempt >= self.policy(kind).attempts
+
+    def _spend(self, kind: str):
+        self.budget -= 1
+        metrics.inc(f"retries_{kind}")
+
+    def delay(self, kind: str, attempt: int) -> Optional[float]:
+        """Backoff before attempt ``attempt + 1``, or None when the keyword should be given up."""
+        if self._should_stop(kind, attempt):
+            return None
+        self._spend(kind)
+        state = RetryCallState(retry_object=None, fn=None, args=(), kwargs={})
+        state.attempt_number = attempt
+        return self.policy(kind).wait(state)
+
+    def _stop(self, state: RetryCallState) -> bool:
+        return self._should_stop(classify_failure(state.outcome.exception()), state.attempt_number)
+
+    def _wait(self, state: RetryCallState) -> float:
+        return self.policy(classify_failure(state.outcome.exception())).wait(state)
+
+    def _before_sleep(self, state: RetryCallState):
+        exc = state.outcome.exception()
+        kind = classify_failure(exc)
+        self._spend(kind)
+        Actor.log.info(
+            f"[retry] {exc} (attempt {state.attempt_number}); retrying in {state.next_action.sleep:.1f}s "
+            f"({self.budget} retries left)."
+        )
+
+    def retrying(self) -> AsyncRetrying:
+        return AsyncRetrying(
+            retry=retry_if_exception_type(Exception),
+            stop=self._stop,
+            wait=self._wait,
+            before_sleep=self._before_sleep,
+            reraise=True,
+        )
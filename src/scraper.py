@@ -1,21 +1,40 @@
 import asyncio
-import json
-import re
 import time
-import gzip
-from typing import Any, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Set
 from apify import Actor
-from playwright.async_api import async_playwright, BrowserContext
-from .models import DouyinResponseModel
-from .utils import parse_douyin_video
+from .aggregate import HashtagAggregator, KeywordStats
+from .archive import archive
+from .aweme_index import AwemeIndex, dedupe_awemes
+from .budget import KeywordPlan
+from .models import DouyinResponseModel, VideoModel
+from .decode_pool import decode_pool
+from .metrics import metrics
+from .stream_decoder import StreamDecoder
+from .recorder import recorder
+from .utils import DOUYIN_BASE_URL, extract_awemes
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext
+    from .session import PooledSession
+
+# Query parameters the site's request hooks add when they sign a request.
+SIGNATURE_PARAMS = {"a_bogus", "X-Bogus", "_signature"}
+
+# Runs in the page, so the site's patched fetch signs the request like its own.
+FETCH_PAGE_JS = """async (url) => {
+  const r = await fetch(url, {credentials: "include"});
+  const body = await r.arrayBuffer();
+  return {status: r.status, bytes: body.byteLength};
+}"""
 
 
 class DouyinScraper:
     """Playwright scraper that dynamically captures /stream/ and /single/ Douyin search API calls."""
 
     TARGET_API_PREFIXES = [
-        "https://www.douyin.com/aweme/v1/web/general/search/stream/",
-        "https://www.douyin.com/aweme/v1/web/general/search/single/",
+        f"{DOUYIN_BASE_URL}/aweme/v1/web/general/search/stream/",
+        f"{DOUYIN_BASE_URL}/aweme/v1/web/general/search/single/",
     ]
 
     def __init__(
@@ -23,60 +42,97 @@ class DouyinScraper:
         keyword: str,
         limit: int = 25,
         context_state_path: str = "douyin_storage_state.json",
-        shared_context: Optional[BrowserContext] = None,
+        shared_context: Optional["BrowserContext"] = None,
+        scroll_pause: float = 0.5,
+        max_scroll_pause: float = 4.0,
+        backoff_factor: float = 2.0,
+        idle_timeout: float = 8.0,
+        aweme_index: Optional[AwemeIndex] = None,
+        strict: bool = False,
+        on_capture: Optional[Callable[[str], None]] = None,
+        plan: Optional[KeywordPlan] = None,
+        pagination: str = "scroll",
     ):
         self.keyword = keyword
         self.limit = limit
         self.context_state_path = context_state_path
         self.shared_context = shared_context
+        self.scroll_pause = scroll_pause
+        self.max_scroll_pause = max_scroll_pause
+        self.backoff_factor = backoff_factor
+        self.idle_timeout = idle_timeout
+        self.aweme_index = aweme_index
+        self.strict = strict
+        self.on_capture = on_capture
+        self.plan = plan
+        self.pagination = pagination
+        # Set by the caller to lease a recycled page instead of opening a new one.
+        self.page_pool: Optional["PooledSession"] = None
 
-        self.collected_chunks: List[dict] = []
         self.videos_flat: List[dict] = []
+        self.seen_ids: Set[str] = set()
+        self.shared_ids: List[str] = []
         self.last_request_time = time.time()
+        self.navigation_started: Optional[float] = None
+        self.first_capture_seen = False
         self.stop_event = asyncio.Event()
+        self.response_event = asyncio.Event()
+        self.exhausted = False
+        self.login_required = False
+        self.api_url: Optional[str] = None
+        self.next_cursor: Optional[int] = None
+
+    def accept_videos(
+        self, awemes: List[dict], limit: Optional[int] = None, aweme_ids: Optional[List[Optional[str]]] = None
+    ) -> List[dict]:
+        """Keep only awemes new to this keyword and not owned by another keyword.
+
+        Items are raw aweme dicts, with their ids in ``aweme_ids`` when the decode
+        pool already extracted them; they are parsed later, in ``parse_posts``,
+        so rejected ones are never parsed. With ``limit``, stops once
+        ``videos_flat`` holds that many.
+        """
+        remaining = None if limit is None else max(0, limit - len(self.videos_flat))
+        accepted = dedupe_awemes(
+            awemes,
+            self.keyword,
+            self.seen_ids,
+            self.aweme_index,
+            self.shared_ids,
+            limit=remaining,
+            aweme_ids=aweme_ids,
+        )
+        self.videos_flat.extend(accepted)
+        return accepted
 
-    @staticmethod
-    def clean_chunked_body(raw_bytes: bytes) -> str:
-        text = raw_bytes.decode("utf-8", errors="ignore")
-        text = re.sub(r"(?mi)^[0-9a-f]+\r?\n", "", text)
-        return text.strip("\x00\r\n\t ")
+    def rearm(self):
+        """Clear the stop state so the keyword can continue on another session.
+
+        Videos collected so far are kept; ``seen_ids`` stops them being added twice.
+        """
+        self.stop_event.clear()
+        self.response_event.clear()
+        self.login_required = False
+        self.exhausted = False
+
+    def _stop(self):
+        self.stop_event.set()
+        self.response_event.set()
 
     @staticmethod
-    def extract_json_chunks(raw_text: str) -> List[Any]:
-        potential_objs = re.findall(r"(\{.*?\})(?=\s*\{|\s*$)", raw_text, re.DOTALL)
-        parsed = []
-        for chunk in potential_objs:
-            try:
-                obj = json.loads(chunk)
-                if not (len(obj) == 1 and "ack" in obj):
-                    parsed.append(obj)
-            except Exception:
-                continue
-        return parsed
+    def extract_json_chunks(raw_bytes: bytes) -> List[Any]:
+        """Decode a /stream/ or /single/ body into its JSON objects, skipping keep-alive acks."""
+        decoder = StreamDecoder()
+        objs = decoder.feed(raw_bytes)
+        objs.extend(decoder.close())
+        metrics.inc("bytes_decoded", decoder.bytes_decoded)
+        metrics.inc("chunks_parsed", decoder.objects_parsed)
+        metrics.inc("chunks_dropped", decoder.segments_dropped)
+        return [obj for obj in objs if not (isinstance(obj, dict) and len(obj) == 1 and "ack" in obj)]
 
     @staticmethod
     def extract_videos_from_obj(obj: Any) -> List[Any]:
-        videos = []
-        data = None
-        if isinstance(obj, dict):
-            if "data" in obj and isinstance(obj["data"], list):
-                data = obj["data"]
-            elif "aweme_list" in obj and isinstance(obj["aweme_list"], list):
-                data = obj["aweme_list"]
-
-        if not data:
-            return videos
-
-        for item in data:
-            aweme = None
-            if isinstance(item, dict):
-                if "aweme_info" in item:
-                    aweme = item["aweme_info"]
-                elif "desc" in item and "aweme_id" in item:
-                    aweme = item
-            if aweme:
-                videos.append(aweme)
-        return videos
+        return extract_awemes(obj)
 
     async def fetch_json(self) -> dict:
         """Main entrypoint: intercept Douyin API calls and return structured data."""
@@ -86,6 +142,8 @@ class DouyinScraper:
             Actor.log.info("[douyin] Reusing shared browser context.")
             context = self.shared_context
         else:
+            from playwright.async_api import async_playwright
+
             async with async_playwright() as p:
                 browser = await p.chromium.launch(
                     headless=True,
@@ -123,14 +181,17 @@ class DouyinScraper:
                 warm_page = await context.new_page()
                 Actor.log.info("[douyin] Warming up new browser session...")
                 try:
-                    await warm_page.goto("https://www.douyin.com", wait_until="domcontentloaded", timeout=60000)
+                    await warm_page.goto(DOUYIN_BASE_URL, wait_until="domcontentloaded", timeout=60000)
                     await asyncio.sleep(5)
                 except Exception as e:
                     Actor.log.warning(f"[douyin] Warmup failed: {e}")
                 await warm_page.close()
                 await context.storage_state(path=self.context_state_path)
 
-        page = await context.new_page()
+        if self.page_pool is not None:
+            page = await self.page_pool.acquire_page()
+        else:
+            page = await context.new_page()
 
         async def on_response(response):
             url = response.url
@@ -138,93 +199,237 @@ class DouyinScraper:
                 return
 
             self.last_request_time = time.time()
+            if self.api_url is None:
+                self.api_url = url
             Actor.log.info(f"[douyin] Captured API: {url}")
+            if self.on_capture:
+                self.on_capture("browser")
+            if not self.first_capture_seen and self.navigation_started is not None:
+                self.first_capture_seen = True
+                metrics.observe("first_capture", time.perf_counter() - self.navigation_started)
 
             try:
-                raw = await response.body()
-                if raw[:2] == b"\x1f\x8b":
-                    raw = gzip.decompress(raw)
-
-                text = self.clean_chunked_body(raw)
-                chunks = self.extract_json_chunks(text)
-
-                if not chunks:
-                    try:
-                        chunks = [json.loads(text)]
-                    except Exception:
-                        Actor.log.warning("[douyin] Non-JSON or empty response.")
-                        return
-
-                for chunk in chunks:
-                    if (
-                        isinstance(chunk, dict)
-                        and chunk.get("search_nil_info", {}).get("search_nil_type") == "web_need_login"
-                    ):
-                        Actor.log.warning("[douyin] Douyin returned web_need_login — session blocked.")
-                        self.stop_event.set()
-                        return
-
-                    new_videos = self.extract_videos_from_obj(chunk)
-                    if new_videos:
-                        self.videos_flat.extend(new_videos)
-                        Actor.log.info(f"[douyin] Added {len(new_videos)} videos (total {len(self.videos_flat)})")
-                        if len(self.videos_flat) >= self.limit:
-                            self.stop_event.set()
-                            return
+                async with decode_pool.slot():
+                    raw = await response.body()
+                    decoded = await decode_pool.decode(
+                        raw,
+                        keep_raw=recorder.enabled,
+                        keep_chunks=archive.enabled,
+                    )
 
-                    self.collected_chunks.append(chunk)
+                metrics.inc("bytes_decoded", decoded["bytes_decoded"])
+                metrics.inc("chunks_parsed", decoded["chunks_parsed"])
+                metrics.inc("chunks_dropped", decoded["chunks_dropped"])
+                if decoded["raw"] is not None:
+                    recorder.record_search(self.keyword, url, decoded["raw"])
+
+                if decoded["cursor"] is not None:
+                    self.next_cursor = decoded["cursor"]
+                if decoded["empty"]:
+                    Actor.log.warning("[douyin] Non-JSON or empty response.")
+                    return
+                if decoded["chunks"] is not None:
+                    archive.append(self.keyword, decoded["chunks"], source="browser")
+
+                if decoded["login_required"]:
+                    Actor.log.warning("[douyin] Douyin returned web_need_login — session blocked.")
+                    self.login_required = True
+                    self._stop()
+                    return
+
+                if self.stop_event.is_set():
+                    return
+                awemes, aweme_ids = decoded["awemes"], decoded["aweme_ids"]
+                new_videos = self.accept_videos(awemes, limit=self.limit, aweme_ids=aweme_ids)
+                if new_videos:
+                    Actor.log.info(f"[douyin] Added {len(new_videos)} videos (total {len(self.videos_flat)})")
+                    while len(self.videos_flat) >= self.limit:
+                        extra = self.plan.extend() if self.plan else 0
+                        if not extra:
+                            self._stop()
+                            return
+                        self.limit += extra
+                        Actor.log.info(f"[douyin] Still productive — quota raised by {extra} to {self.limit}.")
+                        # Awemes of this response held back by the old quota count toward the new one.
+                        held_back = self.accept_videos(awemes, limit=self.limit, aweme_ids=aweme_ids)
+                        if held_back:
+                            Actor.log.info(
+                                f"[douyin] Added {len(held_back)} videos (total {len(self.videos_flat)})"
+                            )
+
+                if decoded["has_more"] is False:
+                    Actor.log.info("[douyin] Search API reports has_more=0 — end of results.")
+                    self.exhausted = True
+                    self._stop()
+                    return
 
             except Exception as e:
                 Actor.log.warning(f"[douyin] Failed decoding response: {e}")
+            finally:
+                # Wake the scroll loop: this page of results has been consumed.
+                self.response_event.set()
 
         page.on("response", on_response)
 
-        search_url = f"https://www.douyin.com/search/{self.keyword}"
+        try:
+            await self._navigate(page)
+            if self.pagination != "fetch" or not await self._fetch_pages(page):
+                await self._scroll(page)
+        finally:
+            Actor.log.info(f"[douyin] Done. {len(self.videos_flat)} videos collected.")
+            page.remove_listener("response", on_response)
+            if self.page_pool is not None:
+                await self.page_pool.release_page(page)
+            else:
+                await page.close()
+
+        if not self.shared_context:
+            await context.close()
+            await browser.close()
+
+        return {"data": self.videos_flat, "shared_ids": self.shared_ids}
+
+    async def _navigate(self, page) -> None:
+        """Open the search page; it requests the first page of results by itself."""
+        search_url = f"{DOUYIN_BASE_URL}/search/{self.keyword}"
         Actor.log.info(f"[douyin] Navigating to {search_url}")
-        await page.goto(search_url, wait_until="domcontentloaded")
+        self.navigation_started = time.perf_counter()
+        with metrics.time("navigation"):
+            await page.goto(search_url, wait_until="domcontentloaded")
 
+            try:
+                await page.wait_for_selector("div[data-e2e='search_general_container']", timeout=20000)
+                Actor.log.info("[douyin] Search container detected.")
+            except Exception:
+                Actor.log.warning("[douyin] Search container not found.")
+
+    def _check_plan(self) -> bool:
+        """Report a pagination round to the keyword plan; True if the keyword should stop."""
+        if not self.plan:
+            return False
+        reason = self.plan.round(len(self.videos_flat))
+        if reason:
+            Actor.log.info(f"[douyin] Stopping '{self.keyword}' early: {reason}.")
+            metrics.inc("keywords_cut_short")
+        return reason is not None
+
+    def _page_url(self, offset: int) -> str:
+        """The captured search API URL for another offset, minus its (page-specific) signature."""
+        parts = urlsplit(self.api_url)
+        params = [
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k not in SIGNATURE_PARAMS and k != "offset"
+        ]
+        params.append(("offset", str(offset)))
+        path = parts.path.replace("/search/stream/", "/search/single/")
+        return urlunsplit((parts.scheme, parts.netloc, path, urlencode(params), ""))
+
+    async def _fetch_pages(self, page, max_empty_pages: int = 3) -> bool:
+        """Request later result pages with the page's own ``fetch`` instead of scrolling.
+
+        Waits for the first search response, then asks for each next offset
+        back-to-back from ``page.evaluate``. The responses reach ``on_response``
+        like any other, and no result card has to be rendered. Returns False
+        when this mode cannot start or breaks, so the caller scrolls instead.
+        """
+        try:
+            await asyncio.wait_for(self.response_event.wait(), timeout=self.idle_timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self.stop_event.is_set():
+            return True
+        if self.api_url is None:
+            Actor.log.warning("[douyin] No search API call captured — falling back to scrolling.")
+            return False
+
+        params = dict(parse_qsl(urlsplit(self.api_url).query))
         try:
-            await page.wait_for_selector("div[data-e2e='search_general_container']", timeout=20000)
-            Actor.log.info("[douyin] Search container detected.")
-        except Exception:
-            Actor.log.warning("[douyin] Search container not found.")
+            offset = int(params.get("offset", 0))
+            step = int(params.get("count", 1))
+        except ValueError:
+            offset, step = 0, 1
+
+        empty_pages = 0
+        Actor.log.info("[douyin] Starting in-page fetch pagination...")
+        while not self.stop_event.is_set():
+            offset = self.next_cursor if self.next_cursor is not None and self.next_cursor > offset else offset + step
+            before = len(self.videos_flat)
+            self.response_event.clear()
+            try:
+                result = await page.evaluate(FETCH_PAGE_JS, self._page_url(offset))
+            except Exception as e:
+                Actor.log.warning(f"[douyin] In-page fetch failed ({e}) — falling back to scrolling.")
+                return False
+            metrics.inc("fetch_pages")
+            if result["status"] != 200:
+                Actor.log.warning(f"[douyin] In-page fetch returned HTTP {result['status']} — falling back to scrolling.")
+                return False
+
+            # on_response decodes the body; continue once it has been consumed.
+            try:
+                await asyncio.wait_for(self.response_event.wait(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                Actor.log.info(f"[douyin] No API response within {self.idle_timeout:g}s — stopping.")
+                break
 
-        idle_limit = 20
-        scroll_pause = 2.5
+            empty_pages = empty_pages + 1 if len(self.videos_flat) == before else 0
+            if empty_pages >= max_empty_pages:
+                Actor.log.info(f"[douyin] {empty_pages} pages without new videos — stopping.")
+                break
+            if self._check_plan():
+                break
+        return True
+
+    async def _scroll(self, page) -> None:
+        """Scroll until the limit is reached or the API goes quiet."""
         scroll_round = 0
+        pause = self.scroll_pause
+        self.last_request_time = time.time()
         Actor.log.info("[douyin] Starting scroll pagination...")
 
         while not self.stop_event.is_set():
+            self.response_event.clear()
             await page.mouse.wheel(0, 800)
             scroll_round += 1
+            metrics.inc("scroll_rounds")
             Actor.log.info(f"[douyin] Scrolled round #{scroll_round}")
-            await asyncio.sleep(scroll_pause)
 
-            if time.time() - self.last_request_time > idle_limit:
-                Actor.log.info("[douyin] No new API calls for 20s — stopping.")
+            # Scroll again as soon as the next page has been consumed; back off
+            # exponentially while the page is not producing API calls.
+            try:
+                await asyncio.wait_for(self.response_event.wait(), timeout=pause)
+                pause = self.scroll_pause
+            except asyncio.TimeoutError:
+                metrics.inc("idle_seconds", pause)
+                pause = min(pause * self.backoff_factor, self.max_scroll_pause)
+
+            if time.time() - self.last_request_time > self.idle_timeout:
+                Actor.log.info(f"[douyin] No new API calls for {self.idle_timeout:g}s — stopping.")
                 break
 
-        Actor.log.info(f"[douyin] Done. {len(self.videos_flat)} videos collected.")
-        await page.close()
-
-        if not self.shared_context:
-            await context.close()
-            await browser.close()
-
-        return {"data": self.videos_flat}
+            if self._check_plan():
+                break
 
-    async def extract_posts(self, data) -> DouyinResponseModel:
-        """Parse collected data into structured models."""
-        raw_data = data.get("data", [])
-        videos = []
-        for aweme in raw_data:
-            parsed = parse_douyin_video(aweme)
-            if parsed:
-                videos.append(parsed)
+    async def parse_posts(self, data) -> List[VideoModel]:
+        """Parse the collected awemes in one batch on the decode pool's parse workers."""
+        parsed = await decode_pool.parse(data.get("data", []), strict=self.strict)
+        metrics.merge(parsed)
+        return parsed["videos"]
+
+    async def extract_posts(self, data, top_creators: int = 5) -> DouyinResponseModel:
+        """Parse collected data into structured models, with this keyword's hashtag aggregates."""
+        videos = await self.parse_posts(data)
+        stats = KeywordStats()
+        for video in videos:
+            stats.add(video)
+        aggregator = HashtagAggregator(top_k=top_creators)
+        aggregator.add({"keyword": self.keyword}, stats)
 
         Actor.log.info(f"[douyin] Parsed {len(videos)} structured videos.")
         return DouyinResponseModel(
             keyword=self.keyword,
             total_results=len(videos),
             videos=videos,
+            aggregated_hashtags=aggregator.aggregate(),
         )
@@ -0,0 +1,466 @@
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Union
+from apify import Actor
+from .metrics import metrics
+from .utils import DOUYIN_BASE_URL
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Page
+    from .resource_filter import ResourceFilter
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+BROWSER_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-infobars",
+    "--disable-web-security",
+    "--no-sandbox",
+    "--disable-gpu",
+]
+
+# Douyin sets these on the first homepage visit; the session is usable once they exist.
+SESSION_COOKIES = ("ttwid", "s_v_web_id")
+
+
+class SessionStore:
+    """Playwright storage state persisted in a named key-value store.
+
+    The state is saved with a ``saved_at`` timestamp so a new Actor container can
+    reuse the cookies of a previous run instead of warming up from scratch. With
+    ``store_name=None`` the state only lives in ``state_path`` (fleet workers,
+    which have no Actor storage of their own).
+    """
+
+    KEY = "storage_state"
+
+    def __init__(
+        self,
+        state_path: str,
+        store_name: Optional[str] = "douyin-session",
+        max_age_hours: float = 12,
+        key: str = KEY,
+    ):
+        self.state_path = state_path
+        self.key = key
+        self.store_name = store_name
+        self.max_age = max_age_hours * 3600
+        self.saved_at: Optional[float] = None
+        self.invalid = False
+
+    @property
+    def fresh(self) -> bool:
+        return (
+            not self.invalid
+            and self.saved_at is not None
+            and time.time() - self.saved_at < self.max_age
+            and os.path.exists(self.state_path)
+        )
+
+    async def load(self) -> bool:
+        """Restore the stored state to ``state_path``. Returns True if one was found."""
+        if self.store_name is None:
+            return False
+        try:
+            store = await Actor.open_key_value_store(name=self.store_name)
+            record = await store.get_value(self.key)
+        except Exception as e:
+            Actor.log.warning(f"[session] Could not read session store '{self.store_name}': {e}")
+            return False
+
+        if not record or not record.get("state"):
+            Actor.log.info(f"[session] No stored session in '{self.store_name}'.")
+            return False
+
+        with open(self.state_path, "w", encoding="utf-8") as fh:
+            json.dump(record["state"], fh)
+        self.saved_at = record.get("saved_at")
+        age = (time.time() - self.saved_at) / 3600 if self.saved_at else float("inf")
+        Actor.log.info(
+            f"[session] Restored stored session ({age:.1f}h old, {'fresh' if self.fresh else 'stale'})."
+        )
+        return True
+
+    async def save(self, context: "BrowserContext"):
+        state = await context.storage_state(path=self.state_path)
+        self.saved_at = time.time()
+        self.invalid = False
+        if self.store_name is None:
+            return
+        try:
+            store = await Actor.open_key_value_store(name=self.store_name)
+            await store.set_value(self.key, {"saved_at": self.saved_at, "state": state})
+            Actor.log.info(f"[session] Storage state saved to '{self.store_name}'.")
+        except Exception as e:
+            Actor.log.warning(f"[session] Could not persist session: {e}")
+
+    def invalidate(self):
+        """Mark the session as burned (e.g. after web_need_login) so it is refreshed."""
+        if not self.invalid:
+            Actor.log.warning("[session] Session marked invalid; it will be refreshed before the next browser use.")
+        self.invalid = True
+
+
+class SessionHealth:
+    """Rolling health score of one pooled session, between 0 (burned) and 1.
+
+    Each finished keyword moves the score towards its outcome: a clean result
+    towards 1 (less for slow ones), an empty result or error towards 0.3 and a
+    login wall straight to 0.
+    """
+
+    OUTCOME_VALUES = {"ok": 1.0, "empty": 0.3, "error": 0.3, "login": 0.0}
+
+    def __init__(self, score: float = 1.0, weight: float = 0.3):
+        self.score = score
+        self.weight = weight
+        self.outcomes: Dict[str, int] = {}
+        self.latency: Optional[float] = None
+
+    def record(self, outcome: str, latency: Optional[float] = None):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        value = self.OUTCOME_VALUES.get(outcome, 0.3)
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+            if outcome == "ok":
+                value -= min(0.5, latency / 120)
+        self.score = value if outcome == "login" else (1 - self.weight) * self.score + self.weight * value
+
+
+class PooledSession:
+    """One browser context of the pool with its own storage state and health."""
+
+    def __init__(self, index: int, store: SessionStore):
+        self.index = index
+        self.store = store
+        self.context: Optional["BrowserContext"] = None
+        self.health = SessionHealth()
+        self.in_flight = 0
+        self.quarantined = False
+        self.idle_pages: List["Page"] = []
+
+    async def acquire_page(self) -> "Page":
+        """Reuse an idle page of this context, or open a new one."""
+        while self.idle_pages:
+            page = self.idle_pages.pop()
+            if not page.is_closed():
+                metrics.inc("pages_reused")
+                return page
+        return await self.context.new_page()
+
+    async def release_page(self, page: "Page"):
+        """Park ``page`` on about:blank for the next keyword; close it if it will not reset."""
+        if page.is_closed():
+            return
+        try:
+            await page.goto("about:blank", timeout=5000)
+        except Exception:
+            await page.close()
+            return
+        self.idle_pages.append(page)
+
+    async def close_context(self):
+        self.idle_pages.clear()
+        if self.context is not None:
+            await self.context.close()
+            self.context = None
+
+    @property
+    def priority(self) -> float:
+        # Prefer healthy sessions, then spread pages across equally healthy ones.
+        return self.health.score - 0.1 * self.in_flight
+
+
+def browser_memory(root_pid: Optional[int] = None) -> Optional[Dict[str, float]]:
+    """RSS in MiB of the Chromium processes below ``root_pid``, split by role.
+
+    Reads ``/proc`` directly, so it needs no extra dependency; returns None
+    where ``/proc`` is unavailable.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    children: Dict[int, List[int]] = {}
+    procs: Dict[int, tuple] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as fh:
+                fields = fh.read().rsplit(b")", 1)[1].split()
+            with open(f"/proc/{entry}/cmdline", "rb") as fh:
+                cmdline = fh.read()
+        except (OSError, IndexError):
+            continue
+        pid, ppid = int(entry), int(fields[1])
+        children.setdefault(ppid, []).append(pid)
+        procs[pid] = (int(fields[21]) * page_mb, cmdline)
+
+    usage = {"browser": 0.0, "renderer": 0.0, "other": 0.0}
+    stack = list(children.get(root_pid or os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        rss, cmdline = procs[pid]
+        if b"chrom" not in cmdline and b"headless_shell" not in cmdline:
+            continue
+        if b"--type=renderer" in cmdline:
+            usage["renderer"] += rss
+        elif b"--type=" in cmdline:
+            usage["other"] += rss
+        else:
+            usage["browser"] += rss
+    return usage
+
+
+def pool_state_path(state_path: str, index: int) -> str:
+    if index == 0:
+        return state_path
+    root, ext = os.path.splitext(state_path)
+    return f"{root}.s{index}{ext}"
+
+
+def pool_stores(
+    state_path: str, size: int, store_name: Optional[str] = "douyin-session", max_age_hours: float = 12
+) -> List[SessionStore]:
+    """One ``SessionStore`` per pool slot; slot 0 keeps the single-session path and key."""
+    return [
+        SessionStore(
+            pool_state_path(state_path, i),
+            store_name=store_name,
+            max_age_hours=max_age_hours,
+            key=SessionStore.KEY if i == 0 else f"{SessionStore.KEY}_{i}",
+        )
+        for i in range(size)
+    ]
+
+
+class BrowserSession:
+    """Chromium browser with a pool of contexts, launched on first use.
+
+    Playwright is imported lazily, so runs served entirely by the direct API
+    never start a browser. Each context has its own storage state; the homepage
+    warm-up runs only when that state is missing, stale or invalidated.
+    Keywords lease the healthiest context with ``acquire`` and report how it
+    went with ``release``. A context that hits a login wall is quarantined and
+    re-warmed in the background with fresh cookies while the others keep
+    serving keywords.
+
+    Chromium's memory grows over a long run, so the browser is restarted after
+    ``recycle_after`` keywords or once its processes exceed ``memory_limit_mb``.
+    The restart waits for in-flight keywords, writes every context's storage
+    state to disk and reopens the contexts from it, so no warm-up is needed.
+    """
+
+    def __init__(
+        self,
+        stores: Union[SessionStore, List[SessionStore]],
+        resource_filter: Optional["ResourceFilter"] = None,
+        recycle_after: int = 0,
+        memory_limit_mb: float = 0,
+    ):
+        if isinstance(stores, SessionStore):
+            stores = [stores]
+        self.sessions = [PooledSession(i, store) for i, store in enumerate(stores)]
+        self.resource_filter = resource_filter
+        self.recycle_after = recycle_after
+        self.memory_limit_mb = memory_limit_mb
+        self.keywords_served = 0
+        self.peak_memory_mb = 0.0
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+        self._available = asyncio.Event()
+        self._available.set()
+        self._rewarming: Set[asyncio.Task] = set()
+
+    @property
+    def store(self) -> SessionStore:
+        """The primary session's store (its state file also backs the direct API client)."""
+        return self.sessions[0].store
+
+    async def acquire(self) -> PooledSession:
+        """Lease the healthiest usable session, launching and warming it if needed."""
+        while True:
+            await self._available.wait()
+            async with self._lock:
+                candidates = [s for s in self.sessions if not s.quarantined]
+                if not candidates:
+                    self._available.clear()
+                    continue
+                session = max(candidates, key=lambda s: s.priority)
+                if self._browser is not None and self._recycle_due():
+                    await self._restart()
+                if self._browser is None:
+                    await self._launch()
+                if session.context is None:
+                    await self._open_context(session)
+                if not session.store.fresh:
+                    await self._warm_up(session)
+                session.in_flight += 1
+                return session
+
+    def release(self, session: PooledSession, outcome: str, latency: Optional[float] = None):
+        """Record a keyword's outcome (ok / empty / error / login) for ``session``."""
+        session.in_flight -= 1
+        self.keywords_served += 1
+        session.health.record(outcome, latency)
+        metrics.inc(f"session_{outcome}")
+        if outcome == "login" and not session.quarantined:
+            self._quarantine(session)
+
+    async def prepare(self):
+        """Launch the browser and warm one session (e.g. so the direct API has cookies)."""
+        session = await self.acquire()
+        session.in_flight -= 1
+
+    def memory_mb(self) -> Optional[float]:
+        usage = browser_memory()
+        if usage is None:
+            return None
+        total = sum(usage.values())
+        if total > self.peak_memory_mb:
+            self.peak_memory_mb = total
+            metrics.peak("browser_rss_mb", total)
+            metrics.peak("renderer_rss_mb", usage["renderer"])
+        return total
+
+    def _recycle_due(self) -> bool:
+        if self._rewarming:
+            # A re-warm is using the browser; check again on the next acquire.
+            return False
+        if self.recycle_after and self.keywords_served >= self.recycle_after:
+            Actor.log.info(f"[session] {self.keywords_served} keywords served — recycling browser.")
+            return True
+        memory = self.memory_mb()
+        if self.memory_limit_mb and memory is not None and memory > self.memory_limit_mb:
+            Actor.log.info(f"[session] Browser uses {memory:.0f} MiB (limit {self.memory_limit_mb:g}) — recycling browser.")
+            return True
+        return False
+
+    async def _restart(self):
+        """Restart Chromium keeping every context's cookies. Called with ``_lock`` held."""
+        while any(s.in_flight for s in self.sessions):
+            await asyncio.sleep(0.25)
+        for session in self.sessions:
+            if session.context is not None and not session.quarantined:
+                await session.context.storage_state(path=session.store.state_path)
+            await session.close_context()
+        await self._browser.close()
+        self._browser = None
+        self.keywords_served = 0
+        metrics.inc("browser_restarts")
+
+    def _quarantine(self, session: PooledSession):
+        session.quarantined = True
+        session.store.invalidate()
+        metrics.inc("sessions_quarantined")
+        Actor.log.warning(f"[session] Session {session.index} hit a login wall — quarantined for re-warm.")
+        if all(s.quarantined for s in self.sessions):
+            self._available.clear()
+        task = asyncio.create_task(self._rewarm(session))
+        self._rewarming.add(task)
+        task.add_done_callback(self._rewarming.discard)
+
+    async def _rewarm(self, session: PooledSession, attempts: int = 3):
+        # Let pages still running on the burned context finish before closing it.
+        while session.in_flight > 0:
+            await asyncio.sleep(0.5)
+        for attempt in range(1, attempts + 1):
+            try:
+                # Under the lock, so a concurrent _restart cannot close the browser mid-rebuild.
+                async with self._lock:
+                    if self._browser is None:
+                        await self._launch()
+                    await session.close_context()
+                    # The stored cookies are what got blocked; start from an empty context.
+                    await self._open_context(session, restore=False)
+                    await self._warm_up(session)
+                break
+            except Exception as e:
+                Actor.log.warning(f"[session] Re-warm of session {session.index} failed ({attempt}/{attempts}): {e}")
+                await asyncio.sleep(10 * attempt)
+        session.health = SessionHealth(score=0.5)
+        session.quarantined = False
+        self._available.set()
+        Actor.log.info(f"[session] Session {session.index} back in rotation.")
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+
+        Actor.log.info("[session] Launching single persistent Chromium browser…")
+        started = time.perf_counter()
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        Actor.log.info(f"[session] Browser ready in {time.perf_counter() - started:.2f}s.")
+
+    async def _open_context(self, session: PooledSession, restore: bool = True):
+        options = {"user_agent": USER_AGENT, "locale": "zh-CN", "viewport": {"width": 1280, "height": 800}}
+        if restore and os.path.exists(session.store.state_path):
+            Actor.log.info(f"[session] Session {session.index}: found existing storage state — reusing cookies.")
+            options["storage_state"] = session.store.state_path
+        session.context = await self._browser.new_context(**options)
+
+        if self.resource_filter:
+            await self.resource_filter.install(session.context)
+
+    async def _warm_up(self, session: PooledSession):
+        context = session.context
+        warm = await context.new_page()
+        Actor.log.info(f"[session] Session {session.index}: warming up Douyin homepage to establish cookies…")
+        try:
+            await warm.goto(DOUYIN_BASE_URL, wait_until="domcontentloaded", timeout=60000)
+            # Wait for the session cookies instead of a fixed sleep.
+            for _ in range(20):
+                names = {c["name"] for c in await context.cookies()}
+                if all(name in names for name in SESSION_COOKIES):
+                    break
+                await asyncio.sleep(0.25)
+        except Exception as e:
+            Actor.log.warning(f"[session] Warm-up failed: {e}")
+        await warm.close()
+        await session.store.save(context)
+
+    async def close(self):
+        for task in list(self._rewarming):
+            task.cancel()
+        opened = [s for s in self.sessions if s.context is not None]
+        if self.resource_filter and opened:
+            self.resource_filter.log_summary()
+        if opened:
+            Actor.log.info("[session] Closing persistent browser contexts.")
+        for session in self.sessions:
+            if session.health.outcomes:
+                Actor.log.info(
+                    f"[session] Session {session.index}: health {session.health.score:.2f}, "
+                    f"outcomes {session.health.outcomes}"
+                )
+            await session.close_context()
+        if self._browser is not None:
+            self.memory_mb()
+            Actor.log.info(f"[session] Peak browser memory {self.peak_memory_mb:.0f} MiB.")
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._playwright = None
+
+
+class ColdStartTimer:
+    """Logs the time from run start to the first captured search API response."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_capture: Optional[float] = None
+
+    def mark(self, source: str):
+        if self.first_capture is not None:
+            return
+        self.first_capture = time.perf_counter() - self.started
+        Actor.log.info(f"[session] First API response after {self.first_capture:.2f}s (via {source}).")
@@ -0,0 +1,98 @@
+import codecs
+import json
+import re
+from typing import Any, List
+
+_HEX_LINE = re.compile(r"[0-9a-fA-F]+\r?\n")
+_CHUNK_SIZE_LINES = re.compile(r"(?mi)\r?\n?^[0-9a-f]+\r?\n")
+_WHITESPACE = " \t\r\n\x00"
+
+
+class StreamDecoder:
+    """Incremental decoder for Douyin ``/search/stream/`` bodies.
+
+    The stream is a sequence of back-to-back JSON objects, optionally separated by
+    HTTP chunk-size lines (a bare hex number on its own line). Bytes are decoded to
+    text exactly once through an incremental UTF-8 decoder and every object is
+    read with ``JSONDecoder.raw_decode`` straight from the buffer, so nested
+    objects are never cut short and nothing is scanned twice.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self.bytes_decoded = 0
+        self.objects_parsed = 0
+        self.segments_dropped = 0
+
+    def feed(self, data: bytes) -> List[Any]:
+        """Add bytes to the buffer and return every complete object they finish."""
+        self.bytes_decoded += len(data)
+        self._buf += self._utf8.decode(data)
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Flush the buffer, resynchronising past anything that is not valid JSON."""
+        self._buf += self._utf8.decode(b"", final=True)
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[Any]:
+        out = []
+        buf = self._buf
+        pos = 0
+        end = len(buf)
+        stripped = False
+
+        while True:
+            while pos < end and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= end:
+                break
+
+            ch = buf[pos]
+            if ch != "{" and ch != "[":
+                hex_line = _HEX_LINE.match(buf, pos)
+                if hex_line:
+                    pos = hex_line.end()
+                    continue
+                if not final and "\n" not in buf[pos:pos + 16]:
+                    # Could be the start of a chunk-size line still in flight.
+                    break
+                nxt = buf.find("{", pos + 1)
+                self.segments_dropped += 1
+                pos = end if nxt < 0 else nxt
+                continue
+
+            try:
+                obj, pos = self._json.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not final:
+                    # Most likely an object that is still arriving; wait for more bytes.
+                    break
+                if not stripped:
+                    # An HTTP chunk boundary can land inside an object; strip the
+                    # size lines from the remainder once and try again.
+                    stripped = True
+                    buf = _CHUNK_SIZE_LINES.sub("", buf[pos:])
+                    pos, end = 0, len(buf)
+                    continue
+                nxt = buf.find("{", pos + 1)
+                self.segments_dropped += 1
+                pos = end if nxt < 0 else nxt
+                continue
+
+            self.objects_parsed += 1
+            out.append(obj)
+
+        # Drop consumed text so the buffer stays proportional to one in-flight object.
+        self._buf = buf[pos:]
+        return out
+
+
+def decode_stream(raw_bytes: bytes) -> List[Any]:
+    """Decode a complete stream body into the list of JSON values it contains."""
+    decoder = StreamDecoder()
+    values = decoder.feed(raw_bytes)
+    values.extend(decoder.close())
+    return values
@@ -0,0 +1,235 @@
+import io
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from apify import Actor
+
+from .metrics import metrics
+from .models import VideoModel
+
+SERIES_KEY = "TREND_SERIES"
+
+
+class TrendStore:
+    """Per-video like/view/heat history, persisted across runs.
+
+    Each ``(aweme_id, keyword)`` pair owns one row of fixed-width arrays holding
+    its last ``max_points`` snapshots, newest in the last column, so a run's
+    lookups are a dict hit each and the trend fields of a whole batch are
+    computed with array operations. A snapshot taken less than
+    ``min_interval_s`` after the previous one replaces it instead of adding a
+    point; points older than ``retention_days`` are dropped when the store is
+    saved, and so are series with none left.
+    """
+
+    def __init__(self):
+        self.store_name: Optional[str] = None
+        self.max_points = 12
+        self.min_interval_s = 1800.0
+        self.retention_s = 14 * 86400.0
+        self.min_span_s = 3600.0
+        self._reset(0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.store_name is not None
+
+    def configure(self, store_name: Optional[str], retention_days: float = 14, max_points: int = 12):
+        self.store_name = store_name
+        self.retention_s = retention_days * 86400
+        self.max_points = max_points
+        self._reset(0)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _reset(self, capacity: int):
+        self.keys: Dict[str, int] = {}
+        self.ts = np.full((capacity, self.max_points), np.nan)
+        self.likes = np.zeros((capacity, self.max_points), dtype=np.int64)
+        self.views = np.zeros((capacity, self.max_points), dtype=np.int64)
+        self.heat = np.full((capacity, self.max_points), np.nan)
+        self.count = np.zeros(capacity, dtype=np.int16)
+
+    def _grow(self, needed: int):
+        capacity = len(self.count)
+        if needed <= capacity:
+            return
+        extra = max(needed, 2 * capacity, 1024) - capacity
+        self.ts = np.vstack([self.ts, np.full((extra, self.max_points), np.nan)])
+        self.likes = np.vstack([self.likes, np.zeros((extra, self.max_points), dtype=np.int64)])
+        self.views = np.vstack([self.views, np.zeros((extra, self.max_points), dtype=np.int64)])
+        self.heat = np.vstack([self.heat, np.full((extra, self.max_points), np.nan)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int16)])
+
+    @staticmethod
+    def key(aweme_id: str, keyword: str) -> str:
+        return f"{aweme_id}\t{keyword}"
+
+    def rows(self, keys: List[str]) -> np.ndarray:
+        """Row of every key, adding empty rows for unseen ones."""
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self.keys.get(key)
+            if row is None:
+                row = self.keys[key] = len(self.keys)
+            rows[i] = row
+        self._grow(len(self.keys))
+        return rows
+
+    def enrich(self, videos: Iterable[VideoModel], keyword_info: dict, batch_size: int = 256) -> Iterator[VideoModel]:
+        """Fill the trend fields of ``videos`` and record their stats as a new snapshot."""
+        if not self.enabled:
+            yield from videos
+            return
+        batch: List[VideoModel] = []
+        for video in videos:
+            batch.append(video)
+            if len(batch) >= batch_size:
+                self._enrich_batch(batch, keyword_info)
+                yield from batch
+                batch = []
+        if batch:
+            self._enrich_batch(batch, keyword_info)
+            yield from batch
+
+    def _enrich_batch(self, videos: List[VideoModel], keyword_info: dict):
+        with metrics.time("trend_enrich"):
+            now = time.time()
+            rows = self.rows([self.key(v.video_id, keyword_info["keyword"]) for v in videos])
+            likes = np.array([v.likes or 0 for v in videos], dtype=np.int64)
+            views = np.array([v.views or 0 for v in videos], dtype=np.int64)
+            published = np.array(
+                [v.publish_time.timestamp() if v.publish_time else np.nan for v in videos], dtype=np.float64
+            )
+            self._compute(videos, rows, now, likes, published)
+            heat = keyword_info.get("heat")
+            self._append(rows, now, likes, views, float(heat) if heat is not None else np.nan)
+
+    def _compute(self, videos: List[VideoModel], rows: np.ndarray, now: float, likes: np.ndarray, published: np.ndarray):
+        p = self.max_points
+        count = self.count[rows].astype(np.int64)
+        # Columns: publish time with 0 likes, the stored points, now. Empty history
+        # columns repeat the publish point so they form zero-length segments.
+        padding = np.arange(p)[None, :] < (p - count)[:, None]
+        ts = np.where(padding, published[:, None], self.ts[rows])
+        hist_likes = np.where(padding, 0, self.likes[rows])
+        ts = np.hstack([published[:, None], ts, np.full((len(rows), 1), now)])
+        all_likes = np.hstack([np.zeros((len(rows), 1)), hist_likes, likes[:, None]]).astype(np.float64)
+
+        dt = np.diff(ts, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(dt > 0, np.diff(all_likes, axis=1) / dt * 3600, np.nan)
+
+            # Velocity since the newest point at least min_span_s old (the publish time otherwise).
+            old_enough = ts[:, :-1] <= now - self.min_span_s
+            ref = np.where(old_enough, np.arange(p + 1)[None, :], 0).max(axis=1)
+            idx = np.arange(len(rows))
+            velocity = (likes - all_likes[idx, ref]) / (now - ts[idx, ref]) * 3600
+            previous = rate[idx, np.maximum(ref - 1, 0)]
+            previous = np.where(ref > 0, previous, np.nan)
+
+        has_rate = ~np.isnan(rate).all(axis=1)
+        peak = np.argmax(np.where(np.isnan(rate), -np.inf, rate), axis=1)
+        peak_ts = ts[idx, peak + 1]
+        since = (now - published) / 3600
+
+        for i, video in enumerate(videos):
+            if not np.isnan(since[i]):
+                video.time_since_publish = round(float(since[i]), 2)
+            if np.isfinite(velocity[i]):
+                video.trend_velocity = round(float(velocity[i]), 2)
+                video.trend_direction = _direction(velocity[i], previous[i])
+            if count[i] and has_rate[i]:
+                video.peak_time = datetime.fromtimestamp(float(peak_ts[i]))
+
+    def _append(self, rows: np.ndarray, now: float, likes: np.ndarray, views: np.ndarray, heat: float):
+        count = self.count[rows]
+        last = self.ts[rows, -1]
+        # Downsample: a snapshot too close to the previous one replaces it.
+        shift = (count > 0) & ~(now - last < self.min_interval_s)
+        shifted = rows[shift]
+        for column in (self.ts, self.likes, self.views, self.heat):
+            column[shifted] = np.roll(column[shifted], -1, axis=1)
+        self.count[rows] = np.minimum(count + (shift | (count == 0)), self.max_points)
+        self.ts[rows, -1] = now
+        self.likes[rows, -1] = likes
+        self.views[rows, -1] = views
+        self.heat[rows, -1] = heat
+
+    def evict(self, now: Optional[float] = None):
+        """Drop points older than the retention window and series left without any."""
+        now = now or time.time()
+        n = len(self.keys)
+        fresh = (self.ts[:n] >= now - self.retention_s).sum(axis=1)
+        self.count[:n] = np.minimum(self.count[:n], fresh)
+        keep = self.count[:n] > 0
+        if keep.all():
+            return
+        kept = np.flatnonzero(keep)
+        keys = [key for key, row in sorted(self.keys.items(), key=lambda item: item[1]) if keep[row]]
+        for name in ("ts", "likes", "views", "heat", "count"):
+            setattr(self, name, getattr(self, name)[kept])
+        self.keys = {key: row for row, key in enumerate(keys)}
+        metrics.inc("trend_series_evicted", n - len(kept))
+
+    async def load(self):
+        if not self.enabled:
+            return
+        try:
+            store = await Actor.open_key_value_store(name=self.store_name)
+            data = await store.get_value(SERIES_KEY)
+        except Exception as e:
+            Actor.log.warning(f"[trends] Could not read trend store '{self.store_name}': {e}")
+            return
+        if not data:
+            Actor.log.info(f"[trends] No stored trend history in '{self.store_name}'.")
+            return
+        with np.load(io.BytesIO(data)) as arrays:
+            keys = json.loads(arrays["keys"].tobytes().decode("utf-8"))
+            if arrays["ts"].shape[1] != self.max_points:
+                Actor.log.warning("[trends] Stored history has a different width; starting afresh.")
+                return
+            self.ts, self.likes, self.views = arrays["ts"], arrays["likes"], arrays["views"]
+            self.heat, self.count = arrays["heat"], arrays["count"]
+        self.keys = {key: row for row, key in enumerate(keys)}
+        Actor.log.info(f"[trends] Restored trend history for {len(self.keys)} videos.")
+
+    async def save(self):
+        if not self.enabled:
+            return
+        self.evict()
+        n = len(self.keys)
+        keys = sorted(self.keys, key=self.keys.get)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            keys=np.frombuffer(json.dumps(keys, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+            ts=self.ts[:n],
+            likes=self.likes[:n],
+            views=self.views[:n],
+            heat=self.heat[:n],
+            count=self.count[:n],
+        )
+        try:
+            store = await Actor.open_key_value_store(name=self.store_name)
+            await store.set_value(SERIES_KEY, buffer.getvalue(), content_type="application/octet-stream")
+            Actor.log.info(f"[trends] Saved trend history for {n} videos ({len(buffer.getvalue()) / 1024:.0f} KiB).")
+        except Exception as e:
+            Actor.log.warning(f"[trends] Could not persist trend history: {e}")
+
+
+def _direction(velocity: float, previous: float, tolerance: float = 0.1) -> Optional[str]:
+    if np.isnan(previous):
+        return None
+    if velocity > previous * (1 + tolerance) + 1e-9:
+        return "rising"
+    if velocity < previous * (1 - tolerance) - 1e-9:
+        return "falling"
+    return "stable"
+
+
+trend_store = TrendStore()
@@ -1,6 +1,11 @@
+import os
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
 from .models import VideoModel, AuthorModel, HashtagModel, MusicModel
+from .records import AuthorRecord, HashtagRecord, MusicRecord, VideoRecord
+
+# Point the scraper at a local stand-in (see bench/standin_server.py) for offline runs.
+DOUYIN_BASE_URL = os.environ.get("DOUYIN_BASE_URL", "https://www.douyin.com").rstrip("/")
 
 
 def safe_get(obj, *keys, default=None):
@@ -13,6 +18,31 @@ def safe_get(obj, *keys, default=None):
     return obj
 
 
+def extract_awemes(obj: Any) -> List[dict]:
+    """Pull the aweme dicts out of one decoded search API object."""
+    videos = []
+    data = None
+    if isinstance(obj, dict):
+        if "data" in obj and isinstance(obj["data"], list):
+            data = obj["data"]
+        elif "aweme_list" in obj and isinstance(obj["aweme_list"], list):
+            data = obj["aweme_list"]
+
+    if not data:
+        return videos
+
+    for item in data:
+        aweme = None
+        if isinstance(item, dict):
+            if "aweme_info" in item:
+                aweme = item["aweme_info"]
+            elif "desc" in item and "aweme_id" in item:
+                aweme = item
+        if aweme:
+            videos.append(aweme)
+    return videos
+
+
 def calc_engagement_rate(likes, comments, shares, views) -> Optional[float]:
     """Compute engagement rate safely."""
     try:
@@ -38,16 +68,21 @@ def get_aspect_ratio(width: int, height: int) -> Optional[str]:
     return f"{width}:{height}"
 
 
-def parse_douyin_video(aweme: dict) -> Optional[VideoModel]:
-    """Parse a single Douyin aweme_info object into VideoModel."""
+def parse_douyin_video(aweme: dict, strict: bool = False) -> Optional[VideoModel]:
+    """Parse a single Douyin aweme_info object into VideoModel.
+
+    By default the result is a ``VideoRecord`` (see ``records.py``), skipping
+    Pydantic entirely: the mapping below already produces the right types for
+    Douyin's payloads. Pass ``strict=True`` to build validated models when
+    debugging a changed upstream schema.
+    """
     if not aweme:
         return None
 
-    author = aweme.get("author", {})
-    stats = aweme.get("statistics", {})
-    video = aweme.get("video", {})
-    music = aweme.get("music", {})
-    cover = safe_get(video, "cover", "url_list", 0)
+    author = aweme.get("author") or {}
+    stats = aweme.get("statistics") or {}
+    video = aweme.get("video") or {}
+    music = aweme.get("music") or {}
     width = video.get("width")
     height = video.get("height")
 
@@ -56,26 +91,31 @@ def parse_douyin_video(aweme: dict) -> Optional[VideoModel]:
     shares = stats.get("share_count", 0)
     views = stats.get("play_count", 0)
 
-    hashtags = [
-    HashtagModel(
-        hashtag_id=h.get("hashtag_id"),
-        hashtag_name=h.get("hashtag_name"),
-        is_commerce=h.get("is_commerce", False),
-    )
-    for h in (aweme.get("text_extra") or [])
-    if isinstance(h, dict) and h.get("hashtag_name")
-]
+    build_video = VideoModel if strict else VideoRecord
+    build_author = AuthorModel if strict else AuthorRecord
+    build_music = MusicModel if strict else MusicRecord
+    build_hashtag = HashtagModel if strict else HashtagRecord
 
+    hashtags = [
+        build_hashtag(
+            hashtag_id=h.get("hashtag_id"),
+            hashtag_name=h.get("hashtag_name"),
+            is_commerce=h.get("is_commerce", False),
+        )
+        for h in (aweme.get("text_extra") or [])
+        if isinstance(h, dict) and h.get("hashtag_name")
+    ]
 
-    author_model = AuthorModel(
+    author_model = build_author(
         author_id=author.get("uid", ""),
         author_name=author.get("nickname"),
         author_followers=author.get("follower_count", 0),
         author_avatar=safe_get(author, "avatar_thumb", "url_list", 0),
         author_verified=bool(author.get("custom_verify")),
+        author_sec_uid=author.get("sec_uid"),
     )
 
-    music_model = MusicModel(
+    music_model = build_music(
         music_id=music.get("id_str"),
         music_title=music.get("title"),
         music_author=music.get("author"),
@@ -84,15 +124,11 @@ def parse_douyin_video(aweme: dict) -> Optional[VideoModel]:
         cover_image=safe_get(music, "cover_medium", "url_list", 0),
     )
 
-    views = stats.get("play_count", 0)
-    likes = stats.get("digg_count", 0)
-    comments = stats.get("comment_count", 0)
-    shares = stats.get("share_count", 0)
-    return VideoModel(
+    return build_video(
         video_id=aweme.get("aweme_id"),
         video_url=safe_get(aweme, "share_info", "share_url"),
         title=aweme.get("desc"),
-        thumbnail=cover,
+        thumbnail=safe_get(video, "cover", "url_list", 0),
         duration=music.get("duration"),
         publish_time=datetime.fromtimestamp(aweme.get("create_time", 0)),
         likes=likes,
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from apify import Actor
+
+from .aweme_index import AwemeIndex
+from .budget import budget_for
+from .hot_trends import fetch_hot_hashtags
+from .metrics import metrics
+from .pipeline import RunState, scrape_keywords
+from .retry import RetryScheduler
+from .trend_store import trend_store
+
+SNAPSHOT_KEY = "HOT_SNAPSHOT"
+
+
+class HotListSnapshot:
+    """The last hot list the watcher saw, with per-keyword scrape times.
+
+    Stored in a named key-value store so a restarted watcher picks up where
+    the previous one stopped instead of re-scraping the whole list.
+    """
+
+    def __init__(self, store_name: str, keywords: Optional[Dict[str, dict]] = None, taken_at: Optional[float] = None):
+        self.store_name = store_name
+        self.keywords: Dict[str, dict] = keywords or {}
+        self.taken_at = taken_at
+
+    @classmethod
+    async def load(cls, store_name: str) -> "HotListSnapshot":
+        try:
+            store = await Actor.open_key_value_store(name=store_name)
+            record = await store.get_value(SNAPSHOT_KEY)
+        except Exception as e:
+            Actor.log.warning(f"[watch] Could not read snapshot store '{store_name}': {e}")
+            record = None
+        if not record:
+            return cls(store_name)
+        snapshot = cls(store_name, record.get("keywords"), record.get("taken_at"))
+        age = (time.time() - snapshot.taken_at) / 60 if snapshot.taken_at else float("inf")
+        Actor.log.info(f"[watch] Restored hot-list snapshot of {len(snapshot.keywords)} keywords ({age:.0f} min old).")
+        return snapshot
+
+    async def save(self):
+        self.taken_at = time.time()
+        try:
+            store = await Actor.open_key_value_store(name=self.store_name)
+            await store.set_value(SNAPSHOT_KEY, {"taken_at": self.taken_at, "keywords": self.keywords})
+        except Exception as e:
+            Actor.log.warning(f"[watch] Could not persist snapshot: {e}")
+
+    def diff(self, hot_list: List[dict], refresh_s: float) -> Tuple[List[dict], List[dict], List[str]]:
+        """Split ``hot_list`` into ``(new, due_refresh, dropped)`` against this snapshot.
+
+        A known keyword is due once ``refresh_s`` has passed since its last
+        scrape, divided by ``1 + |rank movement since that scrape|`` so climbing
+        or falling keywords are refreshed sooner than ones holding their place.
+        """
+        now = time.time()
+        new, due = [], []
+        for kw in hot_list:
+            entry = self.keywords.get(kw["keyword"])
+            if entry is None or entry.get("last_scraped") is None:
+                new.append(kw)
+                continue
+            # Snapshots written before scraped_rank existed only have the last seen rank.
+            scraped_rank = entry.get("scraped_rank", entry["rank"])
+            interval = refresh_s / (1 + abs(scraped_rank - kw["rank"]))
+            if now - entry["last_scraped"] >= interval:
+                due.append(kw)
+        current = {kw["keyword"] for kw in hot_list}
+        dropped = [keyword for keyword in self.keywords if keyword not in current]
+        return new, due, dropped
+
+    def update(self, hot_list: List[dict], scraped: List[dict], dropped: List[str]):
+        """Record the current ranks; ``scraped`` keywords get a fresh scrape time and rank."""
+        now = time.time()
+        scraped_names = {kw["keyword"] for kw in scraped}
+        for keyword in dropped:
+            del self.keywords[keyword]
+        for kw in hot_list:
+            entry = self.keywords.setdefault(kw["keyword"], {"first_seen": now, "last_scraped": None})
+            entry["rank"] = kw["rank"]
+            entry["heat"] = kw.get("heat")
+            if kw["keyword"] in scraped_names:
+                entry["last_scraped"] = now
+                entry["scraped_rank"] = kw["rank"]
+
+
+async def watch(run: RunState, hot_list: List[dict]):
+    """Poll the hot list every ``watch_interval_minutes`` and scrape only what changed.
+
+    New keywords get a full scrape (with the run budget, if one is set). Known
+    keywords only get their top ``watch_refresh_videos`` videos re-scraped, on
+    the rank-dependent cadence of ``HotListSnapshot.diff``. Runs for
+    ``watch_cycles`` cycles, or until the Actor is stopped when that is 0.
+    Each cycle gets its own ``retry_budget``.
+    """
+    cfg = run.cfg
+    snapshot = await HotListSnapshot.load(cfg.watch_store_name)
+    cycle = 0
+    while True:
+        cycle += 1
+        if cycle > 1:
+            hot_list = await fetch_hot_hashtags(limit=cfg.max_hashtags)
+        if not hot_list:
+            Actor.log.warning("[watch] Hot list unavailable; keeping the previous snapshot.")
+        else:
+            await watch_cycle(run, snapshot, hot_list, cycle)
+
+        if cfg.watch_cycles and cycle >= cfg.watch_cycles:
+            break
+        Actor.log.info(f"[watch] Next hot-list poll in {cfg.watch_interval_minutes:g} min.")
+        await asyncio.sleep(cfg.watch_interval_minutes * 60)
+
+
+async def watch_cycle(run: RunState, snapshot: HotListSnapshot, hot_list: List[dict], cycle: int):
+    cfg = run.cfg
+    for i, kw in enumerate(hot_list, start=1):
+        kw["rank"] = kw.get("rank", i)
+    new, due, dropped = snapshot.diff(hot_list, cfg.watch_refresh_minutes * 60)
+    Actor.log.info(
+        f"[watch] Cycle {cycle}: {len(new)} new, {len(due)} due for refresh, "
+        f"{len(hot_list) - len(new) - len(due)} unchanged, {len(dropped)} dropped."
+    )
+    metrics.inc("watch_cycles")
+    metrics.inc("watch_keywords_new", len(new))
+    metrics.inc("watch_keywords_refreshed", len(due))
+    metrics.inc("watch_keywords_unchanged", len(hot_list) - len(new) - len(due))
+    metrics.inc("keywords_requested", len(new) + len(due))
+
+    # Each cycle reports its videos afresh; refreshes exist to update their stats.
+    run.aweme_index = AwemeIndex(strict=cfg.strict_validation)
+    # A burst of failures in one cycle should not leave later cycles without retries.
+    run.retries = RetryScheduler(budget=cfg.retry_budget)
+    failed = []
+    if new:
+        run.budget = budget_for(cfg, new)
+        failed += await scrape_keywords(run, new)
+    if due:
+        run.budget = None
+        refresh = [dict(kw, limit=cfg.watch_refresh_videos) for kw in due]
+        failed += await scrape_keywords(run, refresh)
+    run.budget = None
+
+    failed_names = {kw["keyword"] for kw in failed}
+    scraped = [kw for kw in new + due if kw["keyword"] not in failed_names]
+    if failed:
+        Actor.log.warning(
+            f"[watch] {len(failed)} keywords failed this cycle: " + ", ".join(k["keyword"] for k in failed)
+        )
+    metrics.inc("keywords_failed", len(failed))
+
+    snapshot.update(hot_list, scraped, dropped)
+    await snapshot.save()
+    await trend_store.save()
+    await run.writer.add_aggregates()
+    await run.writer.flush()
+    await metrics.save(prometheus=cfg.metrics_prometheus)